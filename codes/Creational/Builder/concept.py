@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+from examples.batching import DEFAULT_MAX_PENDING, build_in_chunks
+
 
 # Product
 class Product:
@@ -13,8 +15,33 @@ class Product:
         return f"Product= {self.a}, {self.b}, {self.c}"
 
 
+# Compact immutable Product
+class FrozenProduct:
+    __slots__ = ('a', 'b', 'c')
+
+    def __init__(self, a, b, c):
+        object.__setattr__(self, 'a', a)
+        object.__setattr__(self, 'b', b)
+        object.__setattr__(self, 'c', c)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("product is frozen")
+
+    def __delattr__(self, name):
+        raise AttributeError("product is frozen")
+
+    def __reduce__(self):
+        # copy and pickle would restore the slots with setattr
+        return type(self), (self.a, self.b, self.c)
+
+    def __str__(self):
+        return f"Product= {self.a}, {self.b}, {self.c}"
+
+
 # Abstract Builder
 class BaseBuilder(ABC):
+    __slots__ = ()
+
     def __init__(self):
         self.product = Product()
 
@@ -33,6 +60,13 @@ class BaseBuilder(ABC):
     def get_result(self):
         return self.product
 
+    def reset(self):
+        """
+        start a new product with the same builder, so a builder can be reused for many products
+        """
+        self.product = Product()
+        return self
+
 
 # Concrete Builder
 class ConcreteBuilder(BaseBuilder):
@@ -50,6 +84,35 @@ class ConcreteBuilder(BaseBuilder):
         return self
 
 
+# Immutable (persistent) Builder
+class ImmutableBuilder(BaseBuilder):
+    """
+    every set_* returns a new builder and the old one doesn't change, so a half built builder can be forked
+    into many variants without copying. the new builder shares all unchanged values with its parent
+    (only a small tuple of references is created), and get_result returns a compact __slots__ product.
+    """
+    __slots__ = ('_values',)
+
+    def __init__(self, values=(None, None, None)):
+        self._values = values
+
+    def set_a(self, a):
+        return ImmutableBuilder((a, self._values[1], self._values[2]))
+
+    def set_b(self, b):
+        return ImmutableBuilder((self._values[0], b, self._values[2]))
+
+    def set_c(self, c):
+        return ImmutableBuilder((self._values[0], self._values[1], c))
+
+    def get_result(self):
+        return FrozenProduct(*self._values)
+
+    def reset(self):
+        # nothing to reset, the builder never changes, every product is forked from it
+        return self
+
+
 # Director
 class Director:
 
@@ -57,7 +120,35 @@ class Director:
         self.builder = builder
 
     def create_product(self, a, b, c):
-        self.builder.set_a(a).set_b(b).set_c(c)
+        # immutable builders return a new builder from every set_*, keep the last one
+        self.builder = self.builder.set_a(a).set_b(b).set_c(c)
+        return self.builder
+
+    def create_many(self, specs, executor=None, chunk_size=1000, max_pending=DEFAULT_MAX_PENDING):
+        """
+        build one product for every (a, b, c) spec and yield them in order
+
+        the same builder and director are reused, only the products are created, and specs are read lazily,
+        so millions of products can be streamed. with an executor (thread or process pool) chunks of specs are
+        built in parallel, at most max_pending chunks are submitted ahead of the one being yielded.
+        """
+        if executor is None:
+            start = self.builder
+            try:
+                for a, b, c in specs:
+                    self.builder = start.reset()
+                    self.create_product(a, b, c)
+                    yield self.builder.get_result()
+            finally:
+                self.builder = start
+            return
+
+        yield from build_in_chunks(executor, build_batch, self.builder, specs, chunk_size=chunk_size,
+                                   max_pending=max_pending)
+
+
+def build_batch(builder, specs):
+    return list(Director(builder).create_many(specs))
 
 
 # Client Code
@@ -69,11 +160,29 @@ def client_code(a, b, c):
     return product
 
 
+def immutable_client_code():
+    base = ImmutableBuilder().set_a('one').set_b('two')
+    variants = [base.set_c(c).get_result() for c in ('three', 'four', 'five')]
+    return base, variants
+
+
+def batch_client_code(count):
+    director = Director(ConcreteBuilder())
+    specs = ((f'a{i}', f'b{i}', f'c{i}') for i in range(count))
+    return director.create_many(specs)
+
+
 def main():
     product1 = client_code('one', 'two', 'three')
     print(f'Product1: {product1}')
     product2 = client_code('four', 'five', 'six')
     print(f'Product2: {product2}')
+    base, variants = immutable_client_code()
+    print(f'Base: {base.get_result()}')
+    for variant in variants:
+        print(f'Variant: {variant}')
+    for product in batch_client_code(3):
+        print(f'Batch: {product}')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,28 @@
+"""
+fan out batch construction over a thread or process pool
+
+used by the create_many methods of the directors (Builder/concept.py, report.py and simple_orm.py).
+"""
+from collections import deque
+from itertools import islice
+import copy
+
+# chunks submitted ahead of the one being yielded, bounds the memory of results that wait for their turn
+DEFAULT_MAX_PENDING = 8
+
+
+def build_in_chunks(executor, build, builder, specs, *args, chunk_size=1000, max_pending=DEFAULT_MAX_PENDING):
+    """
+    call build(builder, chunk, *args) on the executor for every chunk of chunk_size specs and yield the products
+    of every chunk in order. specs are read lazily and at most max_pending chunks are pending at the same time.
+    build must return a list and with a process pool it must be a module level function.
+    """
+    specs = iter(specs)
+    pending = deque()
+    for chunk in iter(lambda: list(islice(specs, chunk_size)), []):
+        # every chunk gets its own copy of the builder, workers never share a builder
+        pending.append(executor.submit(build, copy.copy(builder), chunk, *args))
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
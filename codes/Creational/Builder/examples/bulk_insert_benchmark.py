@@ -0,0 +1,44 @@
+"""
+load 1M rows into a sqlite file in one transaction, multi row VALUES with different chunk sizes vs executemany
+"""
+import os
+import sqlite3
+import tempfile
+import time
+
+from simple_orm import UserInsertQueryBuilder, bulk_insert, max_variables
+
+
+def rows(count):
+    return ((i, f"user{i}", f"user{i}@example.com", i % 90) for i in range(count))
+
+
+def load(path, count, mode, chunk_size=None):
+    if os.path.exists(path):
+        os.remove(path)
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT, age INTEGER)")
+    builder = UserInsertQueryBuilder().into("users", ["id", "username", "email", "age"]).values(rows(count))
+    if chunk_size:
+        builder.chunk_size(chunk_size)
+    start = time.perf_counter()
+    inserted = bulk_insert(connection, builder.get_query(), mode)
+    elapsed = time.perf_counter() - start
+    connection.close()
+    assert inserted == count
+    return count / elapsed
+
+
+def main(count=1_000_000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "users.db")
+        limit = max_variables(sqlite3.connect(":memory:"))
+        print(f"sqlite variable limit: {limit}")
+        print(f"executemany:            {load(path, count, 'executemany'):>10,.0f} rows/sec")
+        for chunk_size in (10, 50, 249, None, 1000, 10_000):
+            label = f"values, chunk {chunk_size or 'default'}"
+            print(f"{label + ':':<24}{load(path, count, 'values', chunk_size):>10,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+workload driven index advisor for queries built with UserSQLQueryBuilder
+
+the advisor records the where, group_by and order_by columns of executed queries (one sample per query shape),
+runs EXPLAIN QUERY PLAN for them, flags full table scans and proposes covering indexes:
+equality columns first, then one range column, then order_by / group_by columns, then the other selected columns.
+"""
+from collections import OrderedDict
+import re
+import sqlite3
+import time
+
+from simple_orm import QueryExecutor, UserInsertQueryBuilder, UserSQLQueryBuilder, bulk_insert, order_columns
+
+CONDITION = re.compile(r"^\s*(\w+)\s*(==|=|>=|<=|>|<|IS|IN|BETWEEN|LIKE|!=|<>)", re.IGNORECASE)
+IDENTIFIER = re.compile(r"\w+")
+EQUALITY_OPERATORS = {"=", "==", "IS", "IN"}
+RANGE_OPERATORS = {">", "<", ">=", "<=", "BETWEEN"}
+# wider indexes cost too much space and write time, the advisor doesn't make them covering
+MAX_INDEX_COLUMNS = 6
+
+
+class IndexAdvisor:
+    def __init__(self, connection):
+        self.connection = connection
+        # query shape -> [sample query, executions]
+        self.workload = OrderedDict()
+
+    def record(self, query):
+        entry = self.workload.get(query.shape())
+        if entry is None:
+            self.workload[query.shape()] = [query, 1]
+        else:
+            entry[1] += 1
+
+    def explain(self, query):
+        return [row[3] for row in self.connection.execute("EXPLAIN QUERY PLAN " + query.compile()[0],
+                                                          query.compile()[1])]
+
+    def full_scans(self):
+        """
+        return (query, executions, plan) of recorded queries that scan a whole table
+        """
+        scans = []
+        for query, executions in self.workload.values():
+            plan = self.explain(query)
+            if any(step.startswith("SCAN") and "USING" not in step for step in plan):
+                scans.append((query, executions, plan))
+        return scans
+
+    @staticmethod
+    def index_columns(query):
+        equality, ranges = [], []
+        for condition in query.where:
+            match = CONDITION.match(condition)
+            if match is None:
+                continue
+            column, operator = match.group(1), match.group(2).upper()
+            if operator in EQUALITY_OPERATORS:
+                equality.append(column)
+            elif operator in RANGE_OPERATORS:
+                ranges.append(column)
+        columns = list(OrderedDict.fromkeys(equality))
+        if ranges:
+            columns.append(ranges[0])
+        elif query.order_by:
+            columns.extend(order_columns(query.order_by)[0])
+        columns.extend(query.group_by)
+        columns = list(OrderedDict.fromkeys(columns))
+        if not columns:
+            return []
+        # only plain columns can be in an index, not expressions like count(*)
+        selected = [column for column in query.select if IDENTIFIER.fullmatch(column)]
+        covering = list(OrderedDict.fromkeys(columns + selected))
+        return covering if len(covering) <= MAX_INDEX_COLUMNS else columns
+
+    def propose(self):
+        """
+        return CREATE INDEX statements for the full scans, most executed queries first
+        """
+        statements = OrderedDict()
+        for query, _, _ in sorted(self.full_scans(), key=lambda scan: -scan[1]):
+            columns = self.index_columns(query)
+            if columns:
+                name = f"idx_{query.from_table}_{'_'.join(columns)}"
+                statements[f"CREATE INDEX IF NOT EXISTS {name} ON {query.from_table} ({', '.join(columns)})"] = None
+        return list(statements)
+
+    def apply(self):
+        statements = self.propose()
+        with self.connection:
+            for statement in statements:
+                self.connection.execute(statement)
+        self.connection.execute("ANALYZE")
+        return statements
+
+    def replay(self, repeat=1):
+        """
+        run the recorded workload (every shape as many times as it was executed), return the time in seconds
+        """
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for query, executions in self.workload.values():
+                sql, params = query.compile()
+                for _ in range(executions):
+                    self.connection.execute(sql, params).fetchall()
+        return time.perf_counter() - start
+
+
+def main(rows=200_000):
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT, age INTEGER, "
+                       "city TEXT, is_active INTEGER)")
+    bulk_insert(connection, UserInsertQueryBuilder()
+                .into("users", ["id", "username", "email", "age", "city", "is_active"])
+                .values((i, f"user{i}", f"user{i}@example.com", i % 90, f"city{i % 100}", i % 2)
+                        for i in range(rows)).get_query())
+
+    advisor = IndexAdvisor(connection)
+    executor = QueryExecutor(connection, advisor=advisor)
+    for city in range(20):
+        query = UserSQLQueryBuilder().select(["id", "username"]).from_table("users") \
+            .where("city = ?", f"city{city}").where("age > ?", 30).order_by(["username"]).limit(20).get_query()
+        list(executor.iter_rows(query))
+    for age in range(10):
+        query = UserSQLQueryBuilder().select(["city", "count(*)"]).from_table("users") \
+            .where("age = ?", age).group_by(["city"]).get_query()
+        list(executor.iter_rows(query))
+
+    before = advisor.replay()
+    for query, executions, plan in advisor.full_scans():
+        print(f"full scan ({executions} executions): {query}\n    plan: {plan}")
+    for statement in advisor.apply():
+        print(f"created: {statement}")
+    after = advisor.replay()
+    print(f"workload before: {before * 1000:.1f} ms, after: {after * 1000:.1f} ms ({before / after:.1f}x faster)")
+    print(f"full scans left: {len(advisor.full_scans())}")
+
+
+if __name__ == "__main__":
+    main()
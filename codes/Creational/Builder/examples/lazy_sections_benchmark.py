@@ -0,0 +1,50 @@
+"""
+build time of a report with expensive lazy sections: serial, thread pool and process pool
+
+io_section waits like a database query or http call (threads help), cpu_section computes (processes help).
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import os
+import time
+
+from report import FinancialReportBuilder, LazySection, ReportDirector
+
+
+def io_section(number, delay=0.01):
+    time.sleep(delay)
+    return f"io section {number}"
+
+
+def cpu_section(number, size=200_000):
+    total = sum(i * i for i in range(size))
+    return f"cpu section {number}: {total}"
+
+
+def build_and_render(section_function, sections_count, executor=None):
+    builder = FinancialReportBuilder()
+    ReportDirector(builder).construct_summary_report(
+        title="Benchmark Report",
+        introduction="introduction",
+        sections=[LazySection(partial(section_function, number)) for number in range(sections_count)],
+        conclusion="conclusion")
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as output:
+        builder.get_report().render_to(output, executor)
+    return time.perf_counter() - start
+
+
+def main(sections_count=200, workers=8):
+    for name, section_function in (('io bound', io_section), ('cpu bound', cpu_section)):
+        serial = build_and_render(section_function, sections_count)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            threads = build_and_render(section_function, sections_count, executor)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            processes = build_and_render(section_function, sections_count, executor)
+        print(f'{name:<10} serial: {serial:6.2f} s  '
+              f'threads: {threads:6.2f} s ({serial / threads:4.1f}x)  '
+              f'processes: {processes:6.2f} s ({serial / processes:4.1f}x)')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+latency of one page at different depths: LIMIT/OFFSET vs keyset pagination (seek_after)
+"""
+import sqlite3
+import time
+
+from simple_orm import QueryExecutor, UserInsertQueryBuilder, UserSQLQueryBuilder, bulk_insert
+
+
+def create_database(rows):
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT)")
+    bulk_insert(connection, UserInsertQueryBuilder().into("users", ["id", "username", "email"])
+                .values((i, f"user{i}", f"user{i}@example.com") for i in range(rows)).get_query())
+    return connection
+
+
+def page_query(page_size, seek=None):
+    builder = UserSQLQueryBuilder().select(["id", "username", "email"]).from_table("users") \
+        .order_by(["id"]).limit(page_size)
+    if seek is not None:
+        builder.seek_after(seek)
+    return builder.get_query()
+
+
+def timed(function, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(rows=500_000, page_size=100):
+    connection = create_database(rows)
+    for depth in (0, 10_000, 100_000, 490_000):
+        sql, params = page_query(page_size).compile()
+        offset_ms = timed(lambda: connection.execute(sql + " OFFSET ?", params + (depth,)).fetchall())
+        # the id of the row before the page, known from the previous page when reading with keyset pagination
+        seek_sql, seek_params = page_query(page_size, seek=(depth - 1,)).compile()
+        keyset_ms = timed(lambda: connection.execute(seek_sql, seek_params).fetchall())
+        print(f"page at row {depth:>7,}  offset: {offset_ms:7.3f} ms  keyset: {keyset_ms:7.3f} ms")
+
+    executor = QueryExecutor(connection)
+    start = time.perf_counter()
+    count = sum(1 for _ in executor.iter_keyset(page_query(None), page_size=1000))
+    print(f"read all {count:,} rows with iter_keyset in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
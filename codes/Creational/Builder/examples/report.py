@@ -1,4 +1,40 @@
 from abc import ABC, abstractmethod
+from collections import deque
+import io
+import types
+
+from batching import DEFAULT_MAX_PENDING, build_in_chunks
+
+# lazy sections submitted to an executor ahead of the one being written
+MAX_PENDING_SECTIONS = 32
+
+
+class LazySection:
+    """
+    marks a callable as a lazy section, it is called when the report is rendered for the first time
+    """
+    __slots__ = ('function',)
+
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self):
+        return self.function()
+
+
+def is_lazy(section):
+    return isinstance(section, (LazySection, types.GeneratorType))
+
+
+def resolve_section(section):
+    """
+    turn a section into text: a LazySection is called, a generator is joined, anything else goes to str()
+    """
+    if isinstance(section, LazySection):
+        section = section()
+    if isinstance(section, types.GeneratorType):
+        return "".join(str(part) for part in section)
+    return str(section)
 
 
 # Product
@@ -10,15 +46,68 @@ class Report:
         self.conclusion = None
         self.attachments = []
 
+    def iter_sections(self, executor=None, max_pending=MAX_PENDING_SECTIONS):
+        """
+        yield the text of every section in order, lazy sections are resolved here (at render time) and their
+        text replaces them in sections, so the report renders the same every time
+
+        with an executor (ThreadPoolExecutor or ProcessPoolExecutor), lazy sections are resolved in parallel and
+        the order is kept. at most max_pending sections are submitted ahead of the one being written, so memory
+        doesn't grow with the number of sections. the executor is only used while rendering, it is not kept on
+        the report (a report stays picklable).
+        with a ProcessPoolExecutor the lazy sections must be picklable (LazySection of a module level function
+        or functools.partial, not generators).
+        """
+        sections = self.sections
+        if executor is None:
+            for index, section in enumerate(sections):
+                if is_lazy(section):
+                    section = sections[index] = resolve_section(section)
+                    yield section
+                else:
+                    yield str(section)
+            return
+
+        pending = deque()
+        for index, section in enumerate(sections):
+            if is_lazy(section):
+                pending.append((index, executor.submit(resolve_section, section)))
+            else:
+                pending.append((None, str(section)))
+            if len(pending) >= max_pending:
+                yield self._result(*pending.popleft())
+        while pending:
+            yield self._result(*pending.popleft())
+
+    def _result(self, index, section):
+        if index is None:
+            return section
+        self.sections[index] = section.result()
+        return self.sections[index]
+
+    def iter_chunks(self, executor=None, max_pending=MAX_PENDING_SECTIONS):
+        """
+        yield the report text part by part, so big reports never need one big string
+        """
+        yield f"Title: {self.title}\n"
+        yield f"Introduction: {self.introduction}\n"
+        yield "Sections:\n"
+        for i, section in enumerate(self.iter_sections(executor, max_pending), start=1):
+            yield f"  {i}. {section}\n"
+        yield f"Conclusion: {self.conclusion}\n"
+        yield f"Attachments: {', '.join(self.attachments)}\n"
+
+    def render_to(self, stream, executor=None, max_pending=MAX_PENDING_SECTIONS):
+        """
+        write the report to a file like object (file, socket.makefile(), io.StringIO, ...), see iter_sections
+        for executor
+        """
+        stream.writelines(self.iter_chunks(executor, max_pending))
+
     def __str__(self):
-        report_str = f"Title: {self.title}\n"
-        report_str += f"Introduction: {self.introduction}\n"
-        report_str += "Sections:\n"
-        for i, section in enumerate(self.sections):
-            report_str += f"  {i + 1}. {section}\n"
-        report_str += f"Conclusion: {self.conclusion}\n"
-        report_str += f"Attachments: {', '.join(self.attachments)}\n"
-        return report_str
+        buffer = io.StringIO()
+        self.render_to(buffer)
+        return buffer.getvalue()
 
 
 # Abstract Builder
@@ -36,6 +125,11 @@ class ReportBuilder(ABC):
 
     @abstractmethod
     def add_section(self, section):
+        """
+        section can be a string (or any value, it is printed with str()), a LazySection of a callable that
+        returns the text, or a generator that yields parts of it. lazy sections are only evaluated when the
+        report is rendered for the first time, then their text is kept.
+        """
         pass
 
     @abstractmethod
@@ -49,6 +143,13 @@ class ReportBuilder(ABC):
     def get_report(self):
         return self.report
 
+    def reset(self):
+        """
+        start a new report with the same builder
+        """
+        self.report = Report()
+        return self
+
 
 # Concrete Builder
 class FinancialReportBuilder(ReportBuilder):
@@ -93,6 +194,32 @@ class ReportDirector:
             self.builder.add_section(section)
         self.builder.set_conclusion(conclusion)
 
+    def create_many(self, specs, construct="construct_financial_report", executor=None, chunk_size=1000,
+                    max_pending=DEFAULT_MAX_PENDING):
+        """
+        build one report for every spec (a dict of keyword arguments or a tuple of arguments of the construct
+        method) and yield them in order. the builder and director are reused and specs are read lazily.
+        with an executor chunks of specs are built in parallel (with a process pool, reports are pickled, so their
+        sections must be strings or picklable callables).
+        """
+        if executor is None:
+            for spec in specs:
+                self.builder.reset()
+                method = getattr(self, construct)
+                if isinstance(spec, dict):
+                    method(**spec)
+                else:
+                    method(*spec)
+                yield self.builder.get_report()
+            return
+
+        yield from build_in_chunks(executor, build_reports, self.builder, specs, construct, chunk_size=chunk_size,
+                                   max_pending=max_pending)
+
+
+def build_reports(builder, specs, construct):
+    return list(ReportDirector(builder).create_many(specs, construct))
+
 
 # Client Code
 def client_code():
@@ -102,8 +229,9 @@ def client_code():
     sections = [
         "Revenue Analysis",
         "Expense Analysis",
-        "Profit and Loss Statement",
-        "Cash Flow Statement"
+        # lazy sections, computed when the report is rendered
+        LazySection(lambda: "Profit and Loss Statement"),
+        (part for part in ("Cash ", "Flow ", "Statement"))
     ]
     attachments = ["Financial Data.xlsx", "Audit Report.pdf"]
 
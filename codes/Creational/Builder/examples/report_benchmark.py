@@ -0,0 +1,72 @@
+"""
+compare rendering a report with string concatenation and with the streaming renderer
+
+cpython can sometimes grow a string in place on +=, so concatenation is not always quadratic in time,
+but it always holds the whole text in memory. the peak memory column shows what render_to saves.
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+from report import FinancialReportBuilder, ReportDirector
+
+
+def concatenated_str(report):
+    # the old Report.__str__
+    report_str = f"Title: {report.title}\n"
+    report_str += f"Introduction: {report.introduction}\n"
+    report_str += "Sections:\n"
+    for i, section in enumerate(report.sections):
+        report_str += f"  {i + 1}. {section}\n"
+    report_str += f"Conclusion: {report.conclusion}\n"
+    report_str += f"Attachments: {', '.join(report.attachments)}\n"
+    return report_str
+
+
+def build_report(sections_count):
+    builder = FinancialReportBuilder()
+    ReportDirector(builder).construct_financial_report(
+        title="Benchmark Report",
+        introduction="introduction",
+        sections=(f"section number {i} with some text" for i in range(sections_count)),
+        conclusion="conclusion",
+        attachments=["data.xlsx"])
+    return builder.get_report()
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def peak_memory_mb(function):
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'report.txt')
+        for sections_count in (1_000, 10_000, 100_000, 1_000_000):
+            report = build_report(sections_count)
+
+            def render_to_file():
+                with open(path, 'w') as report_file:
+                    report.render_to(report_file)
+
+            print(f'{sections_count:>9,} sections  '
+                  f'concatenation: {timed(lambda: concatenated_str(report)) * 1000:7.1f} ms '
+                  f'{peak_memory_mb(lambda: concatenated_str(report)):6.1f} MB  '
+                  f'str(): {timed(lambda: str(report)) * 1000:7.1f} ms '
+                  f'{peak_memory_mb(lambda: str(report)):6.1f} MB  '
+                  f'render_to(file): {timed(render_to_file) * 1000:7.1f} ms '
+                  f'{peak_memory_mb(render_to_file):6.1f} MB')
+
+
+if __name__ == "__main__":
+    main()
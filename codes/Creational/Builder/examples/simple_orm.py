@@ -1,4 +1,54 @@
 from abc import ABC, abstractmethod
+import copy
+from functools import lru_cache
+from itertools import islice
+import sqlite3
+
+from batching import DEFAULT_MAX_PENDING, build_in_chunks
+
+# sqlite versions before 3.32 allow at most 999 ? placeholders in one statement
+SQLITE_MAX_VARIABLES = 999
+# very long statements are slower to parse, so a bulk insert doesn't use the whole variable limit by default
+DEFAULT_CHUNK_ROWS = 500
+
+
+@lru_cache(maxsize=1024)
+def compile_sql(shape):
+    """
+    build the sql text of a query shape, queries with the same shape (only values differ) share the same text,
+    so the database can reuse its prepared statement. compile_sql.cache_info() shows the cache hit rate.
+    """
+    select, from_table, where, group_by, order_by, has_limit, seek = shape
+    if seek:
+        # keyset pagination: only rows after the last row of the previous page
+        columns, descending = order_columns(order_by)
+        placeholders = ", ".join("?" * len(columns))
+        where += (f"({', '.join(columns)}) {'<' if descending else '>'} ({placeholders})",)
+    query = "SELECT " + ", ".join(select) + " FROM " + from_table
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    if group_by:
+        query += " GROUP BY " + ", ".join(group_by)
+    if order_by:
+        query += " ORDER BY " + ", ".join(order_by)
+    if has_limit:
+        query += " LIMIT ?"
+    return query
+
+
+def order_columns(order_by):
+    """
+    split order_by items ("username", "id DESC") into column names and the direction
+    """
+    columns = []
+    directions = set()
+    for item in order_by:
+        parts = item.split()
+        columns.append(parts[0])
+        directions.add(len(parts) > 1 and parts[1].upper() == "DESC")
+    if len(directions) > 1:
+        raise ValueError("keyset pagination needs all order_by columns in the same direction")
+    return tuple(columns), directions == {True}
 
 
 # Product: SQL Query
@@ -7,21 +57,31 @@ class SQLQuery:
         self.select = []
         self.from_table = None
         self.where = []
+        # values for the ? placeholders of the where conditions
+        self.params = []
         self.group_by = []
         self.order_by = []
         self.limit = None
+        # order_by values of the last row already read (keyset pagination)
+        self.seek = None
 
-    def __str__(self):
-        query = "SELECT " + ", ".join(self.select) + " FROM " + self.from_table
-        if self.where:
-            query += " WHERE " + " AND ".join(self.where)
-        if self.group_by:
-            query += " GROUP BY " + ", ".join(self.group_by)
-        if self.order_by:
-            query += " ORDER BY " + ", ".join(self.order_by)
+    def shape(self):
+        return (tuple(self.select), self.from_table, tuple(self.where), tuple(self.group_by),
+                tuple(self.order_by), bool(self.limit), self.seek is not None)
+
+    def compile(self):
+        """
+        return (sql, params), sql has ? placeholders and can be passed to cursor.execute(sql, params)
+        """
+        params = tuple(self.params)
+        if self.seek is not None:
+            params += tuple(self.seek)
         if self.limit:
-            query += " LIMIT " + str(self.limit)
-        return query
+            params += (self.limit,)
+        return compile_sql(self.shape()), params
+
+    def __str__(self):
+        return self.compile()[0]
 
 
 # Abstract Builder
@@ -38,7 +98,10 @@ class SQLQueryBuilder(ABC):
         pass
 
     @abstractmethod
-    def where(self, condition):
+    def where(self, condition, *params):
+        """
+        condition uses ? placeholders for values, e.g. where("age > ?", 18)
+        """
         pass
 
     @abstractmethod
@@ -53,9 +116,23 @@ class SQLQueryBuilder(ABC):
     def limit(self, max_rows):
         pass
 
+    @abstractmethod
+    def seek_after(self, values):
+        """
+        keyset pagination: only return rows that come after values in order_by order
+        """
+        pass
+
     def get_query(self):
         return self.query
 
+    def reset(self):
+        """
+        start a new query with the same builder
+        """
+        self.query = SQLQuery()
+        return self
+
 
 # Concrete Builder
 class UserSQLQueryBuilder(SQLQueryBuilder):
@@ -67,8 +144,11 @@ class UserSQLQueryBuilder(SQLQueryBuilder):
         self.query.from_table = table_name
         return self
 
-    def where(self, condition):
+    def where(self, condition, *params):
+        if condition.count("?") != len(params):
+            raise ValueError(f"condition {condition!r} needs {condition.count('?')} params, got {len(params)}")
         self.query.where.append(condition)
+        self.query.params.extend(params)
         return self
 
     def group_by(self, columns):
@@ -83,6 +163,14 @@ class UserSQLQueryBuilder(SQLQueryBuilder):
         self.query.limit = max_rows
         return self
 
+    def seek_after(self, values):
+        if not self.query.order_by:
+            raise ValueError("seek_after needs order_by columns")
+        if len(values) != len(self.query.order_by):
+            raise ValueError(f"seek_after needs {len(self.query.order_by)} values, got {len(values)}")
+        self.query.seek = tuple(values)
+        return self
+
 
 # Director (Optional, can be used to construct specific queries)
 class SQLQueryDirector:
@@ -92,7 +180,11 @@ class SQLQueryDirector:
     def construct_user_query(self, columns, table_name, conditions, group_by, order_by, limit):
         self.builder.select(columns).from_table(table_name)
         for condition in conditions:
-            self.builder.where(condition)
+            # a condition is a string or a tuple of (condition, *params)
+            if isinstance(condition, tuple):
+                self.builder.where(*condition)
+            else:
+                self.builder.where(condition)
         if group_by:
             self.builder.group_by(group_by)
         if order_by:
@@ -100,6 +192,226 @@ class SQLQueryDirector:
         if limit:
             self.builder.limit(limit)
 
+    def create_many(self, specs, executor=None, chunk_size=1000, max_pending=DEFAULT_MAX_PENDING):
+        """
+        build one query for every spec (a dict of keyword arguments or a tuple of arguments of
+        construct_user_query) and yield them in order. the builder and director are reused and specs are read
+        lazily. with an executor chunks of specs are built in parallel.
+        """
+        if executor is None:
+            for spec in specs:
+                self.builder.reset()
+                if isinstance(spec, dict):
+                    self.construct_user_query(**spec)
+                else:
+                    self.construct_user_query(*spec)
+                yield self.builder.get_query()
+            return
+
+        yield from build_in_chunks(executor, build_queries, self.builder, specs, chunk_size=chunk_size,
+                                   max_pending=max_pending)
+
+
+def build_queries(builder, specs):
+    return list(SQLQueryDirector(builder).create_many(specs))
+
+
+@lru_cache(maxsize=256)
+def compile_insert_sql(table, columns, rows_count, conflict_columns, update_columns):
+    """
+    build INSERT (or UPSERT) sql text for rows_count rows, all full chunks of a bulk insert share the same text
+    """
+    row_placeholders = "(" + ", ".join("?" * len(columns)) + ")"
+    query = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+             + ", ".join([row_placeholders] * rows_count))
+    if conflict_columns:
+        query += f" ON CONFLICT ({', '.join(conflict_columns)}) "
+        if update_columns:
+            query += "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in update_columns)
+        else:
+            query += "DO NOTHING"
+    return query
+
+
+def max_variables(connection):
+    """
+    the ? placeholder limit of this sqlite connection
+    """
+    if hasattr(connection, 'getlimit'):
+        return connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    return SQLITE_MAX_VARIABLES
+
+
+# Product: Insert Query
+class InsertQuery:
+    def __init__(self):
+        self.table = None
+        self.columns = ()
+        self.rows = ()
+        self.conflict_columns = ()
+        self.update_columns = ()
+        self.chunk_size = None
+
+    def rows_per_chunk(self, variables_limit=SQLITE_MAX_VARIABLES):
+        limit = max(1, variables_limit // len(self.columns))
+        return min(self.chunk_size or DEFAULT_CHUNK_ROWS, limit)
+
+    def _sql(self, rows_count):
+        return compile_insert_sql(self.table, self.columns, rows_count, self.conflict_columns, self.update_columns)
+
+    def compile_batches(self, variables_limit=SQLITE_MAX_VARIABLES):
+        """
+        yield (sql, params) multi row VALUES statements, rows are read from the iterable chunk by chunk
+        """
+        rows_count = self.rows_per_chunk(variables_limit)
+        rows = iter(self.rows)
+        while True:
+            chunk = list(islice(rows, rows_count))
+            if not chunk:
+                return
+            params = [value for row in chunk for value in row]
+            yield self._sql(len(chunk)), params
+
+    def compile_executemany(self):
+        """
+        return (sql, rows) for cursor.executemany, the sql inserts one row
+        """
+        return self._sql(1), self.rows
+
+    def __str__(self):
+        return self._sql(1)
+
+
+# Abstract Builder
+class InsertQueryBuilder(ABC):
+    def __init__(self):
+        self.query = InsertQuery()
+
+    @abstractmethod
+    def into(self, table_name, columns):
+        pass
+
+    @abstractmethod
+    def values(self, rows):
+        """
+        rows is any iterable of tuples (can be a generator), it is only read while the query is executed
+        """
+        pass
+
+    @abstractmethod
+    def on_conflict(self, conflict_columns, update_columns=()):
+        """
+        make the insert an upsert, update_columns are set from the new row, without them conflicts are ignored
+        """
+        pass
+
+    @abstractmethod
+    def chunk_size(self, rows):
+        pass
+
+    def get_query(self):
+        return self.query
+
+
+# Concrete Builder
+class UserInsertQueryBuilder(InsertQueryBuilder):
+    def into(self, table_name, columns):
+        self.query.table = table_name
+        self.query.columns = tuple(columns)
+        return self
+
+    def values(self, rows):
+        self.query.rows = rows
+        return self
+
+    def on_conflict(self, conflict_columns, update_columns=()):
+        self.query.conflict_columns = tuple(conflict_columns)
+        self.query.update_columns = tuple(update_columns)
+        return self
+
+    def chunk_size(self, rows):
+        self.query.chunk_size = rows
+        return self
+
+
+class QueryExecutor:
+    """
+    run compiled queries against a sqlite connection and read the rows lazily
+
+    iter_rows reads the result with fetchmany, so it is never materialized.
+    iter_keyset reads page after page with keyset (seek) pagination: every page starts after the order_by values
+    of the last row of the previous page, so deep pages are as fast as the first one (LIMIT/OFFSET has to skip
+    all previous rows). the order_by columns must be selected and together unique (add the primary key last).
+    the LIMIT of the query caps the total number of rows. rows with a NULL order_by value are skipped after the
+    first page (the row value comparison of the seek condition is never true for NULL), use NOT NULL columns.
+    an advisor (see index_advisor.py) records every executed query.
+    """
+
+    def __init__(self, connection, fetch_size=1000, advisor=None):
+        self.connection = connection
+        self.fetch_size = fetch_size
+        self.advisor = advisor
+
+    def iter_rows(self, query):
+        if self.advisor is not None:
+            self.advisor.record(query)
+        cursor = self.connection.execute(*query.compile())
+        try:
+            while True:
+                rows = cursor.fetchmany(self.fetch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def iter_keyset(self, query, page_size=None):
+        if not query.order_by:
+            raise ValueError("keyset pagination needs order_by columns")
+        if query.group_by:
+            raise ValueError("keyset pagination doesn't support group_by")
+        columns, _ = order_columns(query.order_by)
+        missing = [column for column in columns if column not in query.select]
+        if missing:
+            raise ValueError(f"order_by columns {missing} must be selected for keyset pagination")
+        positions = [query.select.index(column) for column in columns]
+        if self.advisor is not None:
+            self.advisor.record(query)
+
+        page_size = page_size or self.fetch_size
+        remaining = query.limit
+        page = copy.copy(query)
+        while True:
+            page.limit = min(page_size, remaining) if remaining else page_size
+            rows = self.connection.execute(*page.compile()).fetchall()
+            yield from rows
+            if remaining:
+                remaining -= len(rows)
+                if remaining <= 0:
+                    return
+            if len(rows) < page.limit:
+                return
+            page.seek = tuple(rows[-1][position] for position in positions)
+
+
+def bulk_insert(connection, query, mode="values"):
+    """
+    run an InsertQuery in one transaction and return the number of inserted rows
+
+    mode "values" sends multi row VALUES statements, mode "executemany" lets sqlite3 repeat one statement
+    """
+    inserted = 0
+    with connection:
+        if mode == "values":
+            for sql, params in query.compile_batches(max_variables(connection)):
+                inserted += connection.execute(sql, params).rowcount
+        elif mode == "executemany":
+            sql, rows = query.compile_executemany()
+            inserted = connection.executemany(sql, rows).rowcount
+        else:
+            raise ValueError(f"unknown bulk insert mode {mode!r}")
+    return inserted
+
 
 # Client Code
 def client_code():
@@ -108,7 +420,7 @@ def client_code():
 
     columns = ["id", "username", "email"]
     table_name = "users"
-    conditions = ["age > 18", "is_active = True"]
+    conditions = [("age > ?", 18), ("is_active = ?", True)]
     group_by = ["city"]
     order_by = ["username"]
     limit = 10
@@ -117,6 +429,22 @@ def client_code():
     query = builder.get_query()
 
     print(query)
+    print(query.compile()[1])
+
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT)")
+    insert_query = (UserInsertQueryBuilder()
+                    .into("users", ["id", "username", "email"])
+                    .values((i, f"user{i}", f"user{i}@example.com") for i in range(1000))
+                    .on_conflict(["id"], ["username", "email"])
+                    .get_query())
+    print(insert_query)
+    print(f"inserted rows: {bulk_insert(connection, insert_query)}")
+
+    executor = QueryExecutor(connection)
+    page_query = UserSQLQueryBuilder().select(["id", "username"]).from_table("users").where("id >= ?", 500) \
+        .order_by(["id"]).get_query()
+    print(f"rows read page by page: {sum(1 for _ in executor.iter_keyset(page_query, page_size=100))}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+"""
+sqlite benchmark: queries with inlined values vs compiled queries with placeholders
+
+sqlite3 caches prepared statements by sql text (cached_statements, 128 by default). with inlined values every
+query has a new text and must be prepared again, with placeholders all queries of a shape share one statement.
+sqlite3 doesn't expose its cache counters, so its hit rate is simulated with an LRU of the same size.
+"""
+from collections import OrderedDict
+import random
+import sqlite3
+import time
+
+from simple_orm import SQLQueryDirector, UserSQLQueryBuilder, compile_sql
+
+STATEMENT_CACHE_SIZE = 128
+
+
+def create_database(rows=10_000):
+    connection = sqlite3.connect(':memory:', cached_statements=STATEMENT_CACHE_SIZE)
+    connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT, age INTEGER, "
+                       "is_active INTEGER, city TEXT)")
+    connection.executemany("INSERT INTO users (username, email, age, is_active, city) VALUES (?, ?, ?, ?, ?)",
+                           ((f"user{i}", f"user{i}@example.com", i % 90, i % 2, f"city{i % 50}")
+                            for i in range(rows)))
+    connection.execute("CREATE INDEX users_city_age ON users (city, age)")
+    return connection
+
+
+def build_query(conditions, limit):
+    builder = UserSQLQueryBuilder()
+    SQLQueryDirector(builder).construct_user_query(["id", "username", "email"], "users", conditions, None,
+                                                   ["age"], limit)
+    return builder.get_query()
+
+
+def random_values():
+    return random.randint(0, 89), f"city{random.randint(0, 49)}", random.randint(1, 20)
+
+
+def inlined_queries(count):
+    for _ in range(count):
+        age, city, limit = random_values()
+        sql = str(build_query([f"age > {age}", f"city = '{city}'"], limit))
+        # the old builder had the limit inline too
+        yield sql.replace("LIMIT ?", f"LIMIT {limit}"), ()
+
+
+def compiled_queries(count):
+    for _ in range(count):
+        age, city, limit = random_values()
+        yield build_query([("age > ?", age), ("city = ?", city)], limit).compile()
+
+
+def run(connection, queries):
+    statements = OrderedDict()
+    hits = 0
+    total = 0
+    start = time.perf_counter()
+    for sql, params in queries:
+        connection.execute(sql, params).fetchall()
+        total += 1
+        if sql in statements:
+            hits += 1
+            statements.move_to_end(sql)
+        else:
+            statements[sql] = None
+            if len(statements) > STATEMENT_CACHE_SIZE:
+                statements.popitem(last=False)
+    elapsed = time.perf_counter() - start
+    return elapsed / total * 1e6, hits / total
+
+
+def main(count=50_000):
+    connection = create_database()
+    random.seed(1)
+    inlined_latency, inlined_hit_rate = run(connection, inlined_queries(count))
+    compile_sql.cache_clear()
+    random.seed(1)
+    compiled_latency, compiled_hit_rate = run(connection, compiled_queries(count))
+    template_info = compile_sql.cache_info()
+
+    print(f'inlined values: {inlined_latency:6.1f} us/query  statement cache hit rate: {inlined_hit_rate:6.1%}')
+    print(f'placeholders:   {compiled_latency:6.1f} us/query  statement cache hit rate: {compiled_hit_rate:6.1%}  '
+          f'template cache hit rate: {template_info.hits / (template_info.hits + template_info.misses):6.1%}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+fork 100k product variants from a common base builder: deepcopy of a mutable builder vs ImmutableBuilder
+"""
+import copy
+import time
+import tracemalloc
+
+from concept import ConcreteBuilder, ImmutableBuilder
+
+
+def fork_mutable(count):
+    base = ConcreteBuilder().set_a('common a').set_b(['common', 'b'])
+    return [copy.deepcopy(base).set_c(i).get_result() for i in range(count)]
+
+
+def fork_immutable(count):
+    base = ImmutableBuilder().set_a('common a').set_b(['common', 'b'])
+    return [base.set_c(i).get_result() for i in range(count)]
+
+
+def measure(fork, count):
+    start = time.perf_counter()
+    fork(count)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    products = fork(count)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del products
+    return count / elapsed, retained / count
+
+
+def main(count=100_000):
+    for name, fork in (('deepcopy mutable builder', fork_mutable), ('immutable builder', fork_immutable)):
+        throughput, bytes_per_product = measure(fork, count)
+        print(f'{name:<25} {throughput:>12,.0f} variants/sec  {bytes_per_product:6.1f} bytes retained per variant')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+lookups per second on the hot path
+
+- new product: the old factories, a new product object on every call
+- memoized factory: factory.create_database_config() returns the same product
+- product getter: a product kept by the caller
+- resolved config: attribute of the frozen slot config
+- nested dict: config["database"]["connection_string"] for comparison
+"""
+import timeit
+
+from get_configs import DatabaseConfig, ProdConfigFactory, load_config
+
+
+class NewProductFactory:
+    """
+    like the factories before the layered config: a new product with a hard-coded value on every call
+    """
+
+    class ProdDatabaseConfig:
+        def get_connection_string(self):
+            return "prodserver:5432/prod_db"
+
+    def create_database_config(self):
+        return self.ProdDatabaseConfig()
+
+
+def main(number=1_000_000):
+    old_factory = NewProductFactory()
+    factory = ProdConfigFactory()
+    product = factory.create_database_config()
+    config = load_config("prod")
+    nested = {"database": {"connection_string": config.database_connection_string}}
+
+    cases = {
+        "new product": lambda: old_factory.create_database_config().get_connection_string(),
+        "memoized factory": lambda: factory.create_database_config().get_connection_string(),
+        "product getter": product.get_connection_string,
+        "resolved config": lambda: config.database_connection_string,
+        "nested dict": lambda: nested["database"]["connection_string"],
+    }
+    assert isinstance(product, DatabaseConfig)
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=number, repeat=3))
+        print(f"{name:<18} {number / seconds:>14,.0f} lookups/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,142 @@
 from abc import ABC, abstractmethod
+from functools import lru_cache
+import os
+
+# config layers: base values, then the environment layer, then environment variables (APP_<KEY>, e.g.
+# APP_DATABASE_CONNECTION_STRING) override everything
+BASE_CONFIG = {
+    "database": {"connection_string": "localhost:5432/dev_db"},
+    "service": {"url": "http://localhost:8080/dev_service", "timeout": 5},
+    "app": {"name": "App", "debug": False},
+}
+
+ENVIRONMENT_CONFIGS = {
+    "dev": {
+        "app": {"name": "DevApp", "debug": True},
+    },
+    "test": {
+        "database": {"connection_string": "testserver:5432/test_db"},
+        "service": {"url": "http://testserver:8080/test_service"},
+        "app": {"name": "TestApp"},
+    },
+    "prod": {
+        "database": {"connection_string": "prodserver:5432/prod_db"},
+        "service": {"url": "http://prodserver:8080/prod_service", "timeout": 2},
+        "app": {"name": "ProdApp"},
+    },
+}
+
+ENV_PREFIX = "APP_"
+
+
+def flatten(config, prefix=""):
+    """
+    {"database": {"connection_string": ...}} -> {"database_connection_string": ...}
+    """
+    flat = {}
+    for key, value in config.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}_"))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def cast(text, default):
+    # environment variables are strings, convert them to the type of the value they override
+    if isinstance(default, bool):
+        return text.lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        return type(default)(text)
+    return text
+
+
+class FrozenConfig:
+    """
+    base of the resolved config classes, every key is a slot, so reading a value is a plain attribute access
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("config is frozen")
+
+    def __delattr__(self, name):
+        raise AttributeError("config is frozen")
+
+    def __reduce__(self):
+        # copy and pickle would restore the slots with setattr
+        return build_config, (self.__slots__, tuple(getattr(self, key) for key in self.__slots__))
+
+    def __repr__(self):
+        values = ", ".join(f"{key}={getattr(self, key)!r}" for key in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+@lru_cache(maxsize=None)
+def config_class(keys):
+    return type("ResolvedConfig", (FrozenConfig,), {"__slots__": keys})
+
+
+def build_config(keys, values):
+    config = config_class(keys)()
+    for key, value in zip(keys, values):
+        object.__setattr__(config, key, value)
+    return config
+
+
+def resolve_config(environment, environ=None):
+    """
+    merge the layers into one flat frozen config object
+    """
+    environ = os.environ if environ is None else environ
+    values = flatten(BASE_CONFIG)
+    values.update(flatten(ENVIRONMENT_CONFIGS[environment]))
+    for key, default in values.items():
+        name = ENV_PREFIX + key.upper()
+        override = environ.get(name)
+        if override is not None:
+            try:
+                values[key] = cast(override, default)
+            except ValueError as error:
+                raise ValueError(f"invalid value {override!r} for environment variable {name}: {error}") from None
+
+    return build_config(tuple(values), tuple(values.values()))
+
+
+@lru_cache(maxsize=None)
+def load_config(environment):
+    """
+    resolve the config of an environment once (at startup), later calls return the same object
+    """
+    return resolve_config(environment)
+
+
+def reload_configs():
+    """
+    forget resolved configs and products, e.g. after environment variables changed
+    """
+    load_config.cache_clear()
+    ConfigFactory.products.clear()
 
 
 # Abstract Factory
 class ConfigFactory(ABC):
+    environment = None
+    # product class -> product (every environment has its own product classes), all factories of an
+    # environment return the same products
+    products = {}
+
+    @property
+    def config(self):
+        return load_config(self.environment)
+
+    def memoized(self, product_class):
+        try:
+            return ConfigFactory.products[product_class]
+        except KeyError:
+            product = ConfigFactory.products[product_class] = product_class(self.config)
+            return product
+
     @abstractmethod
     def create_database_config(self):
         pass
@@ -18,42 +152,53 @@ class ConfigFactory(ABC):
 
 # Concrete Factory for development configs
 class DevConfigFactory(ConfigFactory):
+    environment = "dev"
+
     def create_database_config(self):
-        return DevDatabaseConfig()
+        return self.memoized(DevDatabaseConfig)
 
     def create_service_config(self):
-        return DevServiceConfig()
+        return self.memoized(DevServiceConfig)
 
     def create_app_config(self):
-        return DevAppConfig()
+        return self.memoized(DevAppConfig)
 
 
 # Concrete Factory for testing configs
 class TestConfigFactory(ConfigFactory):
+    environment = "test"
+
     def create_database_config(self):
-        return TestDatabaseConfig()
+        return self.memoized(TestDatabaseConfig)
 
     def create_service_config(self):
-        return TestServiceConfig()
+        return self.memoized(TestServiceConfig)
 
     def create_app_config(self):
-        return TestAppConfig()
+        return self.memoized(TestAppConfig)
 
 
 # Concrete Factory for production configs
 class ProdConfigFactory(ConfigFactory):
+    environment = "prod"
+
     def create_database_config(self):
-        return ProdDatabaseConfig()
+        return self.memoized(ProdDatabaseConfig)
 
     def create_service_config(self):
-        return ProdServiceConfig()
+        return self.memoized(ProdServiceConfig)
 
     def create_app_config(self):
-        return ProdAppConfig()
+        return self.memoized(ProdAppConfig)
 
 
 # Abstract Products for Database configs
 class DatabaseConfig(ABC):
+    __slots__ = ("config",)
+
+    def __init__(self, config):
+        self.config = config
+
     @abstractmethod
     def get_connection_string(self):
         pass
@@ -61,6 +206,11 @@ class DatabaseConfig(ABC):
 
 # Abstract Products for Service configs
 class ServiceConfig(ABC):
+    __slots__ = ("config",)
+
+    def __init__(self, config):
+        self.config = config
+
     @abstractmethod
     def get_service_url(self):
         pass
@@ -68,6 +218,11 @@ class ServiceConfig(ABC):
 
 # Abstract Products for App configs
 class AppConfig(ABC):
+    __slots__ = ("config",)
+
+    def __init__(self, config):
+        self.config = config
+
     @abstractmethod
     def get_app_name(self):
         pass
@@ -75,56 +230,74 @@ class AppConfig(ABC):
 
 # Concrete Products for Development Database configs
 class DevDatabaseConfig(DatabaseConfig):
+    __slots__ = ()
+
     def get_connection_string(self):
-        return "localhost:5432/dev_db"
+        return self.config.database_connection_string
 
 
 # Concrete Products for Development Service configs
 class DevServiceConfig(ServiceConfig):
+    __slots__ = ()
+
     def get_service_url(self):
-        return "http://localhost:8080/dev_service"
+        return self.config.service_url
 
 
 # Concrete Products for Development App configs
 class DevAppConfig(AppConfig):
+    __slots__ = ()
+
     def get_app_name(self):
-        return "DevApp"
+        return self.config.app_name
 
 
 # Concrete Products for Testing Database configs
 class TestDatabaseConfig(DatabaseConfig):
+    __slots__ = ()
+
     def get_connection_string(self):
-        return "testserver:5432/test_db"
+        return self.config.database_connection_string
 
 
 # Concrete Products for Testing Service configs
 class TestServiceConfig(ServiceConfig):
+    __slots__ = ()
+
     def get_service_url(self):
-        return "http://testserver:8080/test_service"
+        return self.config.service_url
 
 
 # Concrete Products for Testing App configs
 class TestAppConfig(AppConfig):
+    __slots__ = ()
+
     def get_app_name(self):
-        return "TestApp"
+        return self.config.app_name
 
 
 # Concrete Products for Production  Database configs
 class ProdDatabaseConfig(DatabaseConfig):
+    __slots__ = ()
+
     def get_connection_string(self):
-        return "prodserver:5432/prod_db"
+        return self.config.database_connection_string
 
 
 # Concrete Products for Production Service configs
 class ProdServiceConfig(ServiceConfig):
+    __slots__ = ()
+
     def get_service_url(self):
-        return "http://prodserver:8080/prod_service"
+        return self.config.service_url
 
 
 # Concrete Products for Production App configs
 class ProdAppConfig(AppConfig):
+    __slots__ = ()
+
     def get_app_name(self):
-        return "ProdApp"
+        return self.config.app_name
 
 
 # Client Code
@@ -0,0 +1,58 @@
+"""
+render time and output size of the line charts with and without LTTB downsampling
+
+the rows go through chart.series() like in client_code, so the time includes collecting the points.
+without downsampling the series is cut to --raw-max-points (excel can't hold more than 1,048,576 rows
+in the chart data sheet and drawing millions of points in a pdf takes minutes).
+"""
+import argparse
+import io
+from itertools import repeat
+import time
+
+import numpy
+from openpyxl import Workbook
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from report import ExcelReportChart, PDFReportChart
+
+
+def render_pdf(rows, downsample):
+    output = io.BytesIO()
+    doc = canvas.Canvas(output, pagesize=letter)
+    chart = PDFReportChart(downsample=downsample)
+    # the same path client_code uses: the points are collected while the rows are read
+    chart.render(doc, chart.series(rows))
+    doc.save()
+    return output.tell()
+
+
+def render_excel(rows, downsample):
+    output = io.BytesIO()
+    doc = Workbook()
+    chart = ExcelReportChart(downsample=downsample)
+    chart.render(doc, chart.series(rows))
+    doc.save(output)
+    return output.tell()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=10_000_000)
+    parser.add_argument('--raw-max-points', type=int, default=200_000)
+    args = parser.parse_args()
+
+    x = numpy.arange(args.points, dtype=float)
+    y = numpy.sin(x / (args.points / 20)) + numpy.random.default_rng(1).random(args.points)
+    for name, render in (('pdf', render_pdf), ('excel', render_excel)):
+        for downsample, points in ((True, args.points), (False, min(args.points, args.raw_max_points))):
+            start = time.perf_counter()
+            size = render(zip(repeat("item"), y[:points].tolist()), downsample)
+            label = 'lttb' if downsample else 'raw'
+            print(f'{name:<6} {label:<5} {points:>11,} points  {time.perf_counter() - start:7.2f} s  '
+                  f'{size / 1024:10.1f} KB')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+peak RSS and rows/sec of ExcelReportFactory (normal workbook) vs StreamingExcelReportFactory (write-only)
+
+every run is in a fresh process, so the peak RSS of one run doesn't hide the next one.
+the normal workbook keeps every cell in memory, use --normal-max-rows to skip it for the big sizes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from report import ExcelReportFactory, StreamingExcelReportFactory, client_code
+
+
+def rows(count):
+    return ((f"Item {i + 1}", i % 100) for i in range(count))
+
+
+def render(factory, count, path):
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    client_code(factory, path, rows(count))
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return count / elapsed, (peak_rss - start_rss) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 5_000_000])
+    parser.add_argument('--normal-max-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'report.xlsx')
+        for count in args.rows:
+            for factory in (ExcelReportFactory(), StreamingExcelReportFactory()):
+                if isinstance(factory, ExcelReportFactory) and count > args.normal_max_rows:
+                    continue
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    rate, rss_mb = executor.submit(render, factory, count, path).result()
+                print(f'{type(factory).__name__:<28} {count:>10,} rows  {rate:>9,.0f} rows/sec  '
+                      f'peak RSS growth: {rss_mb:7.1f} MB')
+
+
+if __name__ == "__main__":
+    main()
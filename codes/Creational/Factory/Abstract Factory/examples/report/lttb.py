@@ -0,0 +1,112 @@
+"""
+Largest-Triangle-Three-Buckets downsampling for line charts
+
+a chart can't show more points than it has pixels, so a long series is reduced to `threshold` points before
+it is drawn. LTTB keeps the first and last point and from every bucket the point that makes the largest
+triangle with the previous chosen point and the average of the next bucket, so peaks and the shape survive.
+numpy is used when it is installed (the work inside a bucket is vectorized), otherwise plain python.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def lttb(x, y, threshold):
+    """
+    return (x, y) lists with at most threshold points
+    """
+    if len(x) != len(y):
+        raise ValueError("x and y must have the same length")
+    if threshold >= len(x) or threshold < 3:
+        return list(x), list(y)
+    if numpy is not None:
+        return _lttb_numpy(x, y, threshold)
+    return _lttb_python(x, y, threshold)
+
+
+def _bucket_bounds(length, threshold):
+    """
+    start of every bucket, bucket i is bounds[i]:bounds[i + 1] (first and last point are not in a bucket)
+    """
+    # integer arithmetic, with floats i * every can land just under a whole number and the last bound would be
+    # length - 2 instead of length - 1
+    bounds = [1 + i * (length - 2) // (threshold - 2) for i in range(threshold - 1)]
+    bounds[-1] = length - 1
+    return bounds
+
+
+def _lttb_numpy(x, y, threshold):
+    x = numpy.asarray(x, dtype=float)
+    y = numpy.asarray(y, dtype=float)
+    bounds = numpy.array(_bucket_bounds(len(x), threshold))
+    # averages of all buckets at once, the last "bucket" is the last point
+    sizes = numpy.diff(bounds)
+    average_x = numpy.append(numpy.add.reduceat(x[:-1], bounds[:-1]) / sizes, x[-1])
+    average_y = numpy.append(numpy.add.reduceat(y[:-1], bounds[:-1]) / sizes, y[-1])
+
+    selected = numpy.empty(threshold, dtype=numpy.int64)
+    selected[0] = 0
+    selected[-1] = len(x) - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_x, next_y = average_x[i + 1], average_y[i + 1]
+        areas = numpy.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(numpy.argmax(areas))
+        selected[i + 1] = a
+    return x[selected].tolist(), y[selected].tolist()
+
+
+def _lttb_python(x, y, threshold):
+    bounds = _bucket_bounds(len(x), threshold)
+    selected_x, selected_y = [x[0]], [y[0]]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        if i + 2 == len(bounds):
+            # no next bucket, use the last point
+            next_x, next_y = x[-1], y[-1]
+        else:
+            next_start, next_end = end, bounds[i + 2]
+            count = next_end - next_start
+            next_x = sum(x[next_start:next_end]) / count
+            next_y = sum(y[next_start:next_end]) / count
+        ax, ay = x[a], y[a]
+        best_area = -1
+        for j in range(start, end):
+            area = abs((ax - next_x) * (y[j] - ay) - (ax - x[j]) * (next_y - ay))
+            if area > best_area:
+                best_area, a = area, j
+        selected_x.append(x[a])
+        selected_y.append(y[a])
+    selected_x.append(x[-1])
+    selected_y.append(y[-1])
+    return selected_x, selected_y
+
+
+def check_paths(max_length=150, seed=1):
+    """
+    compare the numpy and the python version for every (length, threshold) under max_length, return the
+    number of pairs that gave different points
+    """
+    import random
+
+    rng = random.Random(seed)
+    mismatches = 0
+    for length in range(3, max_length):
+        x = list(range(length))
+        y = [rng.random() for _ in range(length)]
+        for threshold in range(3, length):
+            numpy_x, numpy_y = _lttb_numpy(x, y, threshold)
+            python_x, python_y = _lttb_python(x, y, threshold)
+            if numpy_x != python_x or numpy_y != python_y:
+                mismatches += 1
+    return mismatches
+
+
+if __name__ == "__main__":
+    if numpy is None:
+        print("numpy is not installed, nothing to compare")
+    else:
+        print(f"numpy and python paths differ for {check_paths()} (length, threshold) pairs")
@@ -0,0 +1,81 @@
+"""
+render the same data in several formats at the same time, every factory in its own process
+
+the rows are written once to a temp file (pickle, in chunks), every worker streams them back from the file,
+so the data is pickled once (not once per worker) and no worker holds all rows in memory.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+import pickle
+import random
+import tempfile
+import time
+
+from report import ExcelReportFactory, PDFReportFactory, ReportFactory, StreamingExcelReportFactory, client_code
+
+CHUNK_ROWS = 10_000
+
+
+def spool_rows(data, path):
+    rows = iter(data)
+    with open(path, 'wb') as rows_file:
+        for chunk in iter(lambda: list(islice(rows, CHUNK_ROWS)), []):
+            pickle.dump(chunk, rows_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_rows(path):
+    with open(path, 'rb') as rows_file:
+        while True:
+            try:
+                chunk = pickle.load(rows_file)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def render_from_file(factory: ReportFactory, filename, rows_path):
+    start = time.perf_counter()
+    client_code(factory, filename, read_rows(rows_path))
+    return time.perf_counter() - start
+
+
+def generate_reports(jobs, data, max_workers=None):
+    """
+    jobs is a list of (factory, filename), data any iterable of rows. return the wall time in seconds
+    """
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory:
+        rows_path = os.path.join(directory, 'rows.pickle')
+        spool_rows(data, rows_path)
+        max_workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(render_from_file, factory, filename, rows_path) for factory, filename in jobs]
+            for future in futures:
+                future.result()
+    return time.perf_counter() - start
+
+
+def generate_reports_serial(jobs, data):
+    start = time.perf_counter()
+    data = list(data)
+    for factory, filename in jobs:
+        client_code(factory, filename, data)
+    return time.perf_counter() - start
+
+
+def main(rows=100_000):
+    data = [(f"Item {i + 1}", random.randint(1, 100)) for i in range(rows)]
+    jobs = [
+        (PDFReportFactory(), "company_report.pdf"),
+        (ExcelReportFactory(), "company_report.xlsx"),
+        (StreamingExcelReportFactory(), "company_report_streaming.xlsx"),
+    ]
+    serial = generate_reports_serial(jobs, data)
+    parallel = generate_reports(jobs, data)
+    print(f"{rows:,} rows, {len(jobs)} formats, {os.cpu_count()} cpus")
+    print(f"serial: {serial:.2f} s  parallel: {parallel:.2f} s ({serial / parallel:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
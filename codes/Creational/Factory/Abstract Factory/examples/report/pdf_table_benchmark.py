@@ -0,0 +1,49 @@
+"""
+rows/sec and peak memory of a PDF report (client_code), rows come from a generator
+
+every size runs in a fresh process, so the peak RSS of one run doesn't hide the next one.
+the table never keeps rows, what still grows with the row count is reportlab itself: the canvas keeps every
+finished page (client_code compresses them with pageCompression=1) until save().
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import re
+import resource
+import tempfile
+import time
+
+from report import PDFReportFactory, client_code
+
+
+def rows(count):
+    return ((f"Item {i + 1}", i % 100) for i in range(count))
+
+
+def render(count, path):
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    client_code(PDFReportFactory(), path, rows(count), "Benchmark Report")
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(path, 'rb') as pdf:
+        pages = len(re.findall(rb'/Type /Page\b(?!s)', pdf.read()))
+    return count / elapsed, (peak_rss - start_rss) / 1024, pages, os.path.getsize(path) / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='row counts to render, e.g. --rows 1000000 10000000 (10M rows take several minutes)')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.rows:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                rate, rss_mb, pages, size_mb = executor.submit(
+                    render, count, os.path.join(directory, 'report.pdf')).result()
+            print(f'{count:>10,} rows  {rate:>9,.0f} rows/sec  peak RSS growth: {rss_mb:7.1f} MB  '
+                  f'pages: {pages:,}  file: {size_mb:.1f} MB')
+
+
+if __name__ == "__main__":
+    main()
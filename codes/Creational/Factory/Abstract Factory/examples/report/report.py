@@ -2,8 +2,11 @@ from abc import ABC, abstractmethod
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from openpyxl import Workbook
+from openpyxl.chart import Reference, ScatterChart, Series
 import random
 
+from lttb import lttb
+
 
 # Abstract Factory
 class ReportFactory(ABC):
@@ -44,6 +47,23 @@ class ExcelReportFactory(ReportFactory):
         return ExcelReportChart()
 
 
+# Concrete Factory for big Excel reports
+class StreamingExcelReportFactory(ReportFactory):
+    """
+    products write rows into a write-only workbook, rows go straight to the file and are not kept as cells,
+    so memory doesn't grow with the number of rows. a write-only sheet can only be appended to.
+    """
+
+    def create_header(self):
+        return StreamingExcelReportHeader()
+
+    def create_table(self):
+        return StreamingExcelReportTable()
+
+    def create_chart(self):
+        return StreamingExcelReportChart()
+
+
 # Abstract Product for Header
 class ReportHeader(ABC):
     @abstractmethod
@@ -60,11 +80,187 @@ class ReportTable(ABC):
 
 # Abstract Product for Chart
 class ReportChart(ABC):
+    # points kept while the rows are read, None keeps all of them
+    max_series_points = None
+
+    def series(self, data):
+        """
+        wrap the rows for the table, the chart gets its points from the returned object while the table reads it
+        """
+        return ChartSeries(data, self.max_series_points)
+
     @abstractmethod
     def render(self, doc, data):
         pass
 
 
+# Layout engine for PDF products
+class PDFLayout:
+    """
+    the grid of the page is computed once from the page size, then the table takes cells one by one
+    (top to bottom, then the next column) and a full page is flushed with showPage, so rows can come from
+    any iterable and are never kept in memory. products that come after the table (like the chart) ask
+    for a block below the content of the current page.
+    """
+
+    def __init__(self, doc: canvas.Canvas, pagesize=letter, margin=30, top=720, bottom=60, row_height=20,
+                 column_width=90):
+        width, _ = pagesize
+        self.doc = doc
+        self.margin = margin
+        self.top = top
+        self.bottom = bottom
+        self.row_height = row_height
+        self.column_width = column_width
+        self.rows_per_column = int((top - bottom) // row_height) + 1
+        self.columns_per_page = max(1, int((width - 2 * margin) // column_width))
+        self.font = None
+        self.pages = 1
+        self._row = 0
+        self._column = 0
+        # lowest y used on the current page
+        self.lowest_y = top
+
+    @classmethod
+    def of(cls, doc: canvas.Canvas):
+        """
+        the layout of this document, all products of one document share it
+        """
+        layout = getattr(doc, '_report_layout', None)
+        if layout is None:
+            layout = doc._report_layout = cls(doc, pagesize=doc._pagesize)
+        return layout
+
+    def set_font(self, name, size):
+        self.font = (name, size)
+        self.doc.setFont(name, size)
+
+    def new_page(self):
+        self.doc.showPage()
+        self.pages += 1
+        if self.font:
+            self.doc.setFont(*self.font)
+        self._row = 0
+        self._column = 0
+        self.lowest_y = self.top
+
+    def next_cell(self):
+        """
+        return (x, y) of the next table cell
+        """
+        if self._row == self.rows_per_column:
+            self._row = 0
+            self._column += 1
+            if self._column == self.columns_per_page:
+                self.new_page()
+        x = self.margin + self._column * self.column_width
+        y = self.top - self._row * self.row_height
+        self._row += 1
+        self.lowest_y = min(self.lowest_y, y)
+        return x, y
+
+    def block(self, height):
+        """
+        return (x, y) of a full width block of height under the content, on a new page if it doesn't fit
+        """
+        if self.lowest_y - height < self.bottom - self.row_height:
+            self.new_page()
+        y = self.lowest_y - height
+        self.lowest_y = y
+        self._row = self.rows_per_column
+        self._column = self.columns_per_page - 1
+        return self.margin, y
+
+
+# Chart points collected while the table reads the rows
+class ChartSeries:
+    """
+    iterate over the rows and keep (row number, value) of every row for the chart, so the rows are read only
+    once and can come from a generator.
+
+    with max_points the rows are put in buckets of equal width (in row numbers) and every bucket keeps only its
+    lowest and highest point. when max_points / 2 buckets are full, neighbour buckets are merged and the width
+    doubles, so memory doesn't grow with the number of rows and every part of the x range keeps the same number
+    of points (the chart downsamples them once more with LTTB).
+    """
+
+    def __init__(self, data, max_points=None):
+        self.data = data
+        self.max_points = max_points
+        self.x = []
+        self.y = []
+        self.consumed = False
+
+    def __iter__(self):
+        if self.consumed:
+            # the points are already there, a list can be read again, a generator is empty now
+            yield from self.data
+            return
+        if self.max_points is None:
+            x, y = self.x, self.y
+            for number, row in enumerate(self.data):
+                x.append(number)
+                y.append(row[1])
+                yield row
+            self.consumed = True
+            return
+
+        max_buckets = max(2, self.max_points // 2)
+        # full buckets: [low x, low y, high x, high y], the current bucket ends before bucket_end
+        buckets = []
+        width = 1
+        bucket_end = 0
+        low_x = low_y = high_x = high_y = None
+        for number, row in enumerate(self.data):
+            value = row[1]
+            if number >= bucket_end:
+                if low_x is not None:
+                    buckets.append((low_x, low_y, high_x, high_y))
+                    if len(buckets) == max_buckets:
+                        buckets = [merge_buckets(buckets[i], buckets[i + 1]) for i in range(0, max_buckets, 2)]
+                        width *= 2
+                bucket_end = (len(buckets) + 1) * width
+                low_x = high_x = number
+                low_y = high_y = value
+            elif value < low_y:
+                low_x, low_y = number, value
+            elif value > high_y:
+                high_x, high_y = number, value
+            yield row
+        if low_x is not None:
+            buckets.append((low_x, low_y, high_x, high_y))
+        for low_x, low_y, high_x, high_y in buckets:
+            # both points in x order, one point if the bucket is flat
+            for point_x, point_y in sorted({(low_x, low_y), (high_x, high_y)}):
+                self.x.append(point_x)
+                self.y.append(point_y)
+        self.consumed = True
+
+
+def merge_buckets(first, second):
+    low = first[:2] if first[1] <= second[1] else second[:2]
+    high = first[2:] if first[3] >= second[3] else second[2:]
+    return low + high
+
+
+def chart_series(data):
+    """
+    x (row number) and y (value) of the rows for a chart
+
+    for a ChartSeries these are the points collected while the table read it (it is read now if the table
+    didn't), any other iterable is read here.
+    """
+    if data is None:
+        return [], []
+    if isinstance(data, ChartSeries):
+        if not data.consumed:
+            for _ in data:
+                pass
+        return data.x, data.y
+    values = [value for _, value in data]
+    return list(range(len(values))), values
+
+
 # Concrete Product for PDF Header
 class PDFReportHeader(ReportHeader):
     def render(self, doc: canvas.Canvas, title):
@@ -75,31 +271,50 @@ class PDFReportHeader(ReportHeader):
 # Concrete Product for PDF Table
 class PDFReportTable(ReportTable):
     def render(self, doc: canvas.Canvas, data):
-        doc.setFont("Helvetica", 12)
-        x = 30
-        y = 720
-        for row, (item, value) in enumerate(data, 1):
-
-            doc.drawString(x, y, f"{item}:    {value}")
-            y -= 20
-
-            if row % 34 == 0:
-                x += 90
-                y = 720
-
-            if row % (6 * 34) == 0:
-                doc.showPage()
-                x = 30
-                y = 720
+        """
+        data can be any iterable of (item, value), e.g. a generator reading rows from a database
+        """
+        layout = PDFLayout.of(doc)
+        layout.set_font("Helvetica", 12)
+        draw_string = doc.drawString
+        next_cell = layout.next_cell
+        for item, value in data:
+            x, y = next_cell()
+            draw_string(x, y, f"{item}:    {value}")
 
 
 # Concrete Product for PDF Chart
 class PDFReportChart(ReportChart):
+    """
+    line chart of the values, long series are downsampled with LTTB to one point per point of chart width
+    """
+    width = 550
+    height = 200
+
+    def __init__(self, downsample=True):
+        self.downsample = downsample
+        if downsample:
+            self.max_series_points = 16 * self.width
+
     def render(self, doc: canvas.Canvas, data):
-        x_start, y_start = 30, 720 - (len(data) % 34 * 20) if abs(len(data) - 204) < 34 else 70
-        x_end, y_end = 30 + 550, y_start
-        doc.line(x_start, y_start - 20, x_end, y_end - 20)
-        doc.drawString(30, y_start - 35, "This is a simple line chart")
+        self.draw(doc, *chart_series(data))
+
+    def draw(self, doc: canvas.Canvas, x, y):
+        x_start, y_start = PDFLayout.of(doc).block(self.height + 35)
+        bottom = y_start + 20
+        doc.rect(x_start, bottom, self.width, self.height)
+        if len(x) >= 2:
+            if self.downsample:
+                x, y = lttb(x, y, self.width)
+            min_x, max_x, min_y, max_y = min(x), max(x), min(y), max(y)
+            scale_x = self.width / ((max_x - min_x) or 1)
+            scale_y = self.height / ((max_y - min_y) or 1)
+            path = doc.beginPath()
+            path.moveTo(x_start + (x[0] - min_x) * scale_x, bottom + (y[0] - min_y) * scale_y)
+            for point_x, point_y in zip(x[1:], y[1:]):
+                path.lineTo(x_start + (point_x - min_x) * scale_x, bottom + (point_y - min_y) * scale_y)
+            doc.drawPath(path, stroke=1, fill=0)
+        doc.drawString(x_start, y_start, f"Line chart of {len(x)} points")
 
 
 # Concrete Product for Excel Header
@@ -119,32 +334,158 @@ class ExcelReportTable(ReportTable):
 
 # Concrete Product for Excel Chart
 class ExcelReportChart(ReportChart):
+    """
+    line chart of the values, the points are written to a "Chart Data" sheet, long series are downsampled
+    with LTTB first (to about one point per pixel of the chart width)
+    """
+    max_points = 600
+
+    def __init__(self, downsample=True):
+        self.downsample = downsample
+        if downsample:
+            self.max_series_points = 16 * self.max_points
+
     def render(self, doc: Workbook, data):
+        self.draw(doc, *chart_series(data))
+
+    def draw(self, doc: Workbook, x, y):
         sheet = doc.active
         sheet.append([])
-        sheet.append(["Simple line chart would go here"])
+        if len(x) < 2:
+            sheet.append(["Not enough points for a line chart"])
+            return
+        if self.downsample:
+            x, y = lttb(x, y, self.max_points)
+        data_sheet = doc.create_sheet("Chart Data")
+        data_sheet.append(["x", "y"])
+        for point in zip(x, y):
+            data_sheet.append(point)
+        sheet.add_chart(line_chart(data_sheet, len(x)), "D2")
+        sheet.append([f"Line chart of {len(x)} points"])
+
+
+def line_chart(data_sheet, points):
+    """
+    scatter chart with lines (no markers) of the x, y columns of data_sheet, row 1 is the column titles
+    """
+    chart = ScatterChart()
+    chart.title = "Line chart"
+    chart.style = 13
+    chart.legend = None
+    x_values = Reference(data_sheet, min_col=1, min_row=2, max_row=points + 1)
+    y_values = Reference(data_sheet, min_col=2, min_row=2, max_row=points + 1)
+    series = Series(y_values, x_values)
+    series.marker.symbol = "none"
+    series.smooth = False
+    chart.series.append(series)
+    return chart
+
+
+# Row writer for streaming Excel products
+class ExcelSheetWriter:
+    """
+    appends rows to a write-only workbook (it has no active sheet), when a sheet is full (excel allows
+    1,048,576 rows) the next rows go to a new sheet. all products of one document share it.
+    """
+    max_rows = 1_048_576
+
+    def __init__(self, doc: Workbook):
+        self.doc = doc
+        self.sheet = doc.create_sheet()
+        self.rows = 0
+
+    @classmethod
+    def of(cls, doc: Workbook):
+        writer = getattr(doc, '_report_writer', None)
+        if writer is None:
+            writer = doc._report_writer = cls(doc)
+        return writer
+
+    def append(self, row):
+        if self.rows == self.max_rows:
+            self.sheet = self.doc.create_sheet()
+            self.rows = 0
+        self.sheet.append(row)
+        self.rows += 1
+
+
+# Concrete Product for streaming Excel Header
+class StreamingExcelReportHeader(ReportHeader):
+    def render(self, doc: Workbook, title):
+        ExcelSheetWriter.of(doc).append([title])
 
 
-# Client code
-def client_code(factory: ReportFactory, filename: str, data: list):
-    title = "Company Report"
+# Concrete Product for streaming Excel Table
+class StreamingExcelReportTable(ReportTable):
+    def render(self, doc: Workbook, data):
+        """
+        data can be any iterable of (item, value), e.g. a generator reading rows from a database
+        """
+        append = ExcelSheetWriter.of(doc).append
+        for item, value in data:
+            append((item, value))
+
 
+# Concrete Product for streaming Excel Chart
+class StreamingExcelReportChart(ReportChart):
+    """
+    same chart as ExcelReportChart, the (downsampled) points go to a write-only "Chart Data" sheet and the
+    chart is placed on the last sheet of the table
+    """
+    max_points = 600
+
+    def __init__(self, downsample=True):
+        self.downsample = downsample
+        if downsample:
+            self.max_series_points = 16 * self.max_points
+
+    def render(self, doc: Workbook, data):
+        self.draw(doc, *chart_series(data))
+
+    def draw(self, doc: Workbook, x, y):
+        writer = ExcelSheetWriter.of(doc)
+        writer.append([])
+        if len(x) < 2:
+            writer.append(["Not enough points for a line chart"])
+            return
+        if self.downsample:
+            x, y = lttb(x, y, self.max_points)
+        data_sheet = doc.create_sheet("Chart Data")
+        data_sheet.append(["x", "y"])
+        for point in zip(x, y):
+            data_sheet.append(point)
+        writer.sheet.add_chart(line_chart(data_sheet, len(x)), "D2")
+        writer.append([f"Line chart of {len(x)} points"])
+
+
+# Client code
+def client_code(factory: ReportFactory, filename: str, data: list, title: str = "Company Report"):
     header = factory.create_header()
     table = factory.create_table()
     chart = factory.create_chart()
+    # the table reads the rows once, the chart gets its points on the way
+    rows = chart.series(data)
 
     if isinstance(factory, PDFReportFactory):
-        doc = canvas.Canvas(filename, pagesize=letter)
+        # finished pages stay in memory until save, compressed they take a lot less
+        doc = canvas.Canvas(filename, pagesize=letter, pageCompression=1)
         header.render(doc, title)
-        table.render(doc, data)
-        chart.render(doc, data)
+        table.render(doc, rows)
+        chart.render(doc, rows)
         doc.save()
 
     elif isinstance(factory, ExcelReportFactory):
         doc = Workbook()
         header.render(doc, title)
-        table.render(doc, data)
-        chart.render(doc, data)
+        table.render(doc, rows)
+        chart.render(doc, rows)
+        doc.save(filename)
+
+    elif isinstance(factory, StreamingExcelReportFactory):
+        doc = Workbook(write_only=True)
+        header.render(doc, title)
+        table.render(doc, rows)
+        chart.render(doc, rows)
         doc.save(filename)
 
 
@@ -0,0 +1,143 @@
+"""
+content addressed cache for generated reports
+
+the key is a hash of the factory type, the title and the data (hashed row by row while it is read, so a
+generator is read only once: it is spooled to a temp file at the same time). on a hit the cached file is
+hard linked (or copied) to the output filename instead of rendering it again. cached files are evicted
+least recently used first when the cache is bigger than max_bytes.
+"""
+import hashlib
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from parallel_reports import read_rows, spool_rows
+from report import ExcelReportFactory, PDFReportFactory, ReportFactory, client_code
+
+
+class HashingRows:
+    """
+    iterate over rows and hash them at the same time
+    """
+
+    def __init__(self, rows, digest):
+        self.rows = rows
+        self.digest = digest
+
+    def __iter__(self):
+        update = self.digest.update
+        for row in self.rows:
+            # repr is stable for the str / int / float values of a report row (marshal output is not)
+            update(repr(row).encode())
+            update(b"\n")
+            yield row
+
+
+class ReportCache:
+    def __init__(self, directory, max_bytes=1024 ** 3, link=True):
+        """
+        link: hard link cached files to the output (fast, no extra space, the output must not be modified in
+        place), otherwise they are copied
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, factory: ReportFactory, title, data):
+        """
+        return (key, rows), rows must be used instead of data (a generator has been read already)
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{type(factory).__module__}.{type(factory).__qualname__}\n{title}\n".encode())
+        if isinstance(data, (list, tuple)):
+            for _ in HashingRows(data, digest):
+                pass
+            return digest.hexdigest(), data
+        spool = tempfile.NamedTemporaryFile(dir=self.directory, suffix=".rows", delete=False)
+        spool.close()
+        try:
+            spool_rows(HashingRows(data, digest), spool.name)
+        except BaseException:
+            # generate() only cleans up the spool file after a key was returned
+            os.remove(spool.name)
+            raise
+        return digest.hexdigest(), spool.name
+
+    def path(self, key, filename):
+        return os.path.join(self.directory, key + os.path.splitext(filename)[1])
+
+    def _place(self, cached, filename):
+        if os.path.exists(filename):
+            os.remove(filename)
+        if self.link:
+            try:
+                os.link(cached, filename)
+                return
+            except OSError:
+                # different file system (or no hard links), copy it
+                pass
+        shutil.copyfile(cached, filename)
+
+    def generate(self, factory: ReportFactory, filename, data, title="Company Report"):
+        """
+        write the report to filename, from the cache if the same report was generated before. return True on a hit
+        """
+        key, rows = self.key(factory, title, data)
+        try:
+            cached = self.path(key, filename)
+            if os.path.exists(cached):
+                self.hits += 1
+                os.utime(cached)
+                self._place(cached, filename)
+                return True
+
+            self.misses += 1
+            temp_path = f"{cached}.{os.getpid()}.tmp"
+            client_code(factory, temp_path, read_rows(rows) if isinstance(rows, str) else rows, title)
+            os.replace(temp_path, cached)
+            self._place(cached, filename)
+            self.evict()
+            return False
+        finally:
+            if isinstance(rows, str):
+                os.remove(rows)
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith((".rows", ".tmp")):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def main(rows=20_000):
+    data = [(f"Item {i + 1}", random.randint(1, 100)) for i in range(rows)]
+    cache = ReportCache(os.path.join(tempfile.gettempdir(), "report_cache"))
+    for factory, filename in ((PDFReportFactory(), "company_report.pdf"),
+                              (ExcelReportFactory(), "company_report.xlsx")):
+        for attempt in range(3):
+            start = time.perf_counter()
+            hit = cache.generate(factory, filename, iter(data))
+            print(f"{filename}: {'hit ' if hit else 'miss'} {time.perf_counter() - start:.3f} s")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+multi threaded benchmark for multiton registries
+
+run from the codes directory: python -m Creational.Multiton.benchmark
+every thread creates its own part of 1M distinct keys, then all threads create the same keys at the same time
+to check that every key is constructed exactly once.
+with a cheap constructor the GIL serializes everything and the global lock baseline has less overhead,
+the slow constructor scenario (like opening a file or connection) shows what the striped locks are for.
+"""
+import argparse
+import threading
+import time
+
+from Creational.Multiton.concept import ShardedMultitonRegistry
+
+
+class GlobalLockRegistry:
+    """
+    baseline: one dict and one lock, the instance is created while holding the lock
+    """
+
+    def __init__(self):
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._instances)
+
+    def get_or_create(self, key, factory):
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is None:
+                instance = self._instances[key] = factory()
+            return instance
+
+
+class Item:
+    __slots__ = ('key', '__weakref__')
+
+    def __init__(self, key, construct_time=0):
+        self.key = key
+        if construct_time:
+            time.sleep(construct_time)
+
+
+def run_threads(threads_count, target):
+    barrier = threading.Barrier(threads_count + 1)
+
+    def worker(index):
+        barrier.wait()
+        target(index)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def distinct_keys(registry, keys_count, threads_count, construct_time=0):
+    def create(index):
+        for key in range(index, keys_count, threads_count):
+            registry.get_or_create(key, lambda key=key: Item(key, construct_time))
+
+    elapsed = run_threads(threads_count, create)
+    return keys_count / elapsed, len(registry)
+
+
+def same_keys(registry, keys_count, threads_count):
+    constructions = []
+
+    def factory(key):
+        constructions.append(key)
+        return Item(key)
+
+    def create(index):
+        for key in range(keys_count):
+            registry.get_or_create(key, lambda key=key: factory(key))
+
+    run_threads(threads_count, create)
+    return len(constructions)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--keys', type=int, default=1_000_000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--shards', type=int, default=64)
+    parser.add_argument('--slow-keys', type=int, default=2000)
+    parser.add_argument('--construct-time', type=float, default=0.001, help='slow constructor time in seconds')
+    args = parser.parse_args()
+
+    registries = {
+        'global lock': GlobalLockRegistry,
+        f'sharded ({args.shards})': lambda: ShardedMultitonRegistry(shards=args.shards),
+    }
+    for name, make_registry in registries.items():
+        rate, size = distinct_keys(make_registry(), args.keys, args.threads)
+        constructions = same_keys(make_registry(), args.keys // 10, args.threads)
+        print(f'{name:<15} distinct keys: {rate:,.0f} creates/sec ({size:,} instances), '
+              f'same keys: {constructions:,} constructions for {args.keys // 10:,} keys')
+        rate, _ = distinct_keys(make_registry(), args.slow_keys, args.threads, args.construct_time)
+        print(f'{name:<15} slow constructor: {rate:,.0f} creates/sec')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,223 @@
+from collections import OrderedDict
+import threading
+import time
+import weakref
+
 from Creational.Singleton.concept import BaseClass
 
 
+class MultitonRegistry:
+    """
+    storage for multiton instances
+
+    without options it keeps every key forever (like a plain dict). it can be bounded with:
+    - max_size: when full, the least recently used instance is evicted
+    - ttl: instances older than ttl seconds are evicted, on access and when new instances are added
+    - weak: instances are kept in a WeakValueDictionary, unused instances are collected by python
+    """
+
+    def __init__(self, max_size=None, ttl=None, weak=False):
+        if weak and (max_size is not None or ttl is not None):
+            raise ValueError('weak registry can not be combined with max_size or ttl')
+        if max_size is not None and max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        self.max_size = max_size
+        self.ttl = ttl
+        self.weak = weak
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # strong mode: key -> (instance, expires_at)
+        self._entries = weakref.WeakValueDictionary() if weak else OrderedDict()
+
+    def __len__(self):
+        self._expire()
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def _lookup(self, key):
+        if self.weak:
+            return self._entries.get(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        instance, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        if self.max_size is not None:
+            self._entries.move_to_end(key)
+        return instance
+
+    def _store(self, key, instance):
+        if self.weak:
+            self._entries[key] = instance
+            weakref.finalize(instance, self._on_collected)
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (instance, expires_at)
+        # a replaced key keeps its old position, newest entries must be at the end
+        self._entries.move_to_end(key)
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._expire()
+
+    def _expire(self):
+        """
+        drop expired entries. without max_size entries are in insertion order, that is the order they expire in,
+        so only the front is checked. with max_size they are in LRU order and all (at most max_size) are checked.
+        """
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        entries = self._entries
+        if self.max_size is None:
+            while entries:
+                key, (_, expires_at) = next(iter(entries.items()))
+                if expires_at > now:
+                    break
+                del entries[key]
+                self.evictions += 1
+        else:
+            for key in [key for key, (_, expires_at) in entries.items() if expires_at <= now]:
+                del entries[key]
+                self.evictions += 1
+
+    def _on_collected(self):
+        self.evictions += 1
+
+    def get(self, key):
+        instance = self._lookup(key)
+        if instance is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return instance
+
+    def add(self, key, instance):
+        self._store(key, instance)
+
+    def get_or_create(self, key, factory):
+        """
+        return the instance of key, call factory() to create it if it doesn't exist
+        """
+        instance = self.get(key)
+        if instance is None:
+            instance = factory()
+            self.add(key, instance)
+        return instance
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {'size': len(self), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class ShardedMultitonRegistry:
+    """
+    thread safe multiton registry for a lot of keys
+
+    keys are split into shards by hash, every shard is a MultitonRegistry with its own lock (striped locks),
+    so threads working with keys of different shards never wait for each other.
+    instances are created outside of the shard lock: a slow constructor only blocks threads asking for the
+    same key, and each key is created exactly once.
+    with max_size every shard holds max_size / shards instances and keeps its own LRU order, so an instance can
+    be evicted when its shard is full while the whole registry is not. to keep that rare a shard holds at least
+    min_shard_size instances: a smaller max_size uses fewer shards, under 2 * min_shard_size a single shard
+    (exact LRU).
+    """
+    min_shard_size = 64
+
+    def __init__(self, shards=16, max_size=None, ttl=None, weak=False):
+        if max_size is not None:
+            shards = max(1, min(shards, max_size // self.min_shard_size))
+        shard_size = -(-max_size // shards) if max_size is not None else None
+        self._shards = [MultitonRegistry(max_size=shard_size, ttl=ttl, weak=weak) for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        # keys that are being created right now: key -> lock held by the creating thread
+        self._creating = [{} for _ in range(shards)]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def __contains__(self, key):
+        index = hash(key) % len(self._shards)
+        with self._locks[index]:
+            return key in self._shards[index]
+
+    def get_or_create(self, key, factory):
+        index = hash(key) % len(self._shards)
+        shard, lock, creating = self._shards[index], self._locks[index], self._creating[index]
+        while True:
+            with lock:
+                instance = shard.get(key)
+                if instance is not None:
+                    return instance
+                creating_lock = creating.get(key)
+                if creating_lock is None:
+                    creating_lock = creating[key] = threading.Lock()
+                    creating_lock.acquire()
+                    break
+            # another thread is creating this key, wait for it and look again
+            creating_lock.acquire()
+            creating_lock.release()
+
+        try:
+            instance = factory()
+        except BaseException:
+            with lock:
+                del creating[key]
+            creating_lock.release()
+            raise
+        with lock:
+            shard.add(key, instance)
+            del creating[key]
+        creating_lock.release()
+        return instance
+
+    def clear(self):
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.clear()
+
+    def stats(self):
+        totals = {'size': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                for name, value in shard.stats().items():
+                    totals[name] += value
+        return totals
+
+
 class MultitonMeta(type):
     """
     use this metaclass to create multiton class
+
+    every class has its own thread safe registry, so two classes can use the same key.
+    registry options can be passed as class keywords:
+    class MyClass(metaclass=MultitonMeta, max_size=1000, ttl=60), class MyClass(metaclass=MultitonMeta, weak=True)
+    or class MyClass(metaclass=MultitonMeta, shards=64)
+
+    with max_size eviction is LRU per shard (see ShardedMultitonRegistry): exact LRU for max_size under 128,
+    approximately LRU for bigger registries.
     """
-    _instance = {}
+
+    def __new__(mcs, name, bases, namespace, **registry_options):
+        return super().__new__(mcs, name, bases, namespace)
+
+    def __init__(cls, name, bases, namespace, **registry_options):
+        super().__init__(name, bases, namespace)
+        cls._instance = ShardedMultitonRegistry(**registry_options)
 
     def __call__(cls, key, *args, **kwargs):
-        if key not in cls._instance:
-            cls._instance[key] = super(MultitonMeta, cls).__call__(key, *args, **kwargs)
-        return cls._instance[key]
+        return cls._instance.get_or_create(key, lambda: super(MultitonMeta, cls).__call__(key, *args, **kwargs))
 
 
 class Multiton(BaseClass, metaclass=MultitonMeta):
@@ -18,26 +225,43 @@ class Multiton(BaseClass, metaclass=MultitonMeta):
         super().__init__(key)
 
 
+class BoundedMultiton(BaseClass, metaclass=MultitonMeta, max_size=2):
+    def __init__(self, key):
+        super().__init__(key)
+
+
 class MultitonClass(BaseClass):
-    _instance = {}
+    """
+    every subclass gets its own registry, subclasses can also set one, e.g. _instance = MultitonRegistry(max_size=1000)
+    """
+    _instance = MultitonRegistry()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if '_instance' not in cls.__dict__:
+            cls._instance = MultitonRegistry()
 
     def __new__(cls, key, *args, **kwargs):
-        if key not in cls._instance:
-            cls._instance[key] = super(MultitonClass, cls).__new__(cls)
-        return cls._instance[key]
+        return cls._instance.get_or_create(key, lambda: super(MultitonClass, cls).__new__(cls))
 
     def __init__(self, key):
         super().__init__(key)
 
 
-def multiton(cls):
-    cls._instance = {}
+def multiton(cls=None, *, max_size=None, ttl=None, weak=False):
+    """
+    multiton decorator, can be used as @multiton or @multiton(max_size=..., ttl=..., weak=...)
+    """
+    if cls is None:
+        return lambda decorated: multiton(decorated, max_size=max_size, ttl=ttl, weak=weak)
+
+    cls._instance = MultitonRegistry(max_size=max_size, ttl=ttl, weak=weak)
 
     def get_instance(key, *args, **kwargs):
-        if key not in cls._instance:
-            cls._instance[key] = cls(key, *args, **kwargs)
-        return cls._instance[key]
+        return cls._instance.get_or_create(key, lambda: cls(key, *args, **kwargs))
 
+    get_instance.registry = cls._instance
+    get_instance.__wrapped__ = cls
     return get_instance
 
 
@@ -47,6 +271,28 @@ class MultitonDecorator(BaseClass):
         super().__init__(key)
 
 
+@multiton(weak=True)
+class WeakMultitonDecorator(BaseClass):
+    def __init__(self, key):
+        super().__init__(key)
+
+
+def bounded_multiton():
+    print('bounded multiton infos')
+    s7 = BoundedMultiton(7)
+    BoundedMultiton(8)
+    BoundedMultiton(9)
+    s8 = BoundedMultiton(7)
+    print(f'is s7 == s8 (s7 was evicted): {s7 is s8}')
+    print(f'registry stats: {BoundedMultiton._instance.stats()}')
+
+    s9 = WeakMultitonDecorator(9)
+    print(f'weak registry size: {len(WeakMultitonDecorator.registry)}')
+    del s9
+    print(f'weak registry size after del: {len(WeakMultitonDecorator.registry)}')
+    print(f'weak registry stats: {WeakMultitonDecorator.registry.stats()}')
+
+
 def decorator_multiton():
     print('decorator multiton infos')
     s5 = MultitonDecorator(5)
@@ -63,6 +309,8 @@ def metaclass_multiton():
     s1.show_id('s1')
     s2.show_id('s2')
     print(f'is s1 == s2: {s1 is s2}')
+    s10 = BoundedMultiton(1)
+    print(f'same key in another class, is s1 == s10: {s1 is s10}')
 
 
 def class_multiton():
@@ -80,3 +328,5 @@ if __name__ == "__main__":
     class_multiton()
     print('*' * 25)
     decorator_multiton()
+    print('*' * 25)
+    bounded_multiton()
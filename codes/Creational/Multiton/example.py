@@ -1,4 +1,247 @@
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+import atexit
 import logging
+import queue
+import threading
+
+from Creational.Multiton.concept import MultitonRegistry
+
+
+class OverflowQueueHandler(QueueHandler):
+    """
+    queue handler for a bounded queue, when the queue is full:
+    - block: wait until the listener makes room
+    - drop-oldest: remove the oldest record from the queue
+    - drop-new: drop the new record
+    """
+    policies = ('block', 'drop-oldest', 'drop-new')
+    # what QueueListener.stop puts in the queue
+    sentinel = QueueListener._sentinel
+
+    def __init__(self, log_queue, overflow='block'):
+        if overflow not in self.policies:
+            raise ValueError(f'overflow must be one of {self.policies}')
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record):
+        # the queue is in the same process, so the record doesn't have to be formatted and copied on the
+        # caller's thread (that is what QueueHandler does), only merge args because they may change later
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                self.dropped += 1
+                if self.overflow == 'drop-new':
+                    return
+            if not self.drop_oldest():
+                return
+
+    def drop_oldest(self):
+        """
+        remove the oldest record from the queue, return False if the oldest item is the stop sentinel of the
+        listener (it must stay, the listener is stopping and the new record is dropped instead)
+        """
+        log_queue = self.queue
+        with log_queue.mutex:
+            if log_queue.queue and log_queue.queue[0] is self.sentinel:
+                return False
+            if log_queue.queue:
+                log_queue.queue.popleft()
+                # the dropped record will never be handled, queue.join() must not wait for it
+                log_queue.unfinished_tasks -= 1
+                if not log_queue.unfinished_tasks:
+                    log_queue.all_tasks_done.notify_all()
+                log_queue.not_full.notify()
+        return True
+
+
+class BatchFlushMixin:
+    """
+    handler that doesn't flush after every record, the listener calls flush_batch after each batch
+    """
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchFileHandler(BatchFlushMixin, logging.FileHandler):
+    pass
+
+
+class BatchStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class FileHandlePool:
+    """
+    budget for open log files
+
+    at most max_open PooledFileHandler streams are open at the same time. when a handler opens its file and the
+    budget is full, the least recently used handler closes its file first (the open waits for its lock if it is
+    writing or flushing right now). the closed handler reopens its file (in append mode) on next write.
+    opens and closes count the churn, if they grow fast the budget is too small.
+    """
+
+    def __init__(self, max_open=256):
+        self.max_open = max_open
+        self.opens = 0
+        self.closes = 0
+        # handlers with an open file that were not asked to close yet, in LRU order
+        self._handlers = OrderedDict()
+        # all open files, including the ones that are being closed
+        self._open_files = 0
+        self._lock = threading.Lock()
+        self._closed_file = threading.Condition(self._lock)
+
+    @property
+    def open_count(self):
+        return self._open_files
+
+    def open(self, handler, opener):
+        """
+        open the file of handler with opener() once it fits in the budget, evicting other handlers
+        """
+        with self._lock:
+            while self._open_files >= self.max_open:
+                if not self._handlers:
+                    # every open file is being closed by another open
+                    self._closed_file.wait()
+                    continue
+                evicted = self._handlers.popitem(last=False)[0]
+                evicted.close_requested = True
+                # never wait for a handler lock while holding the pool lock
+                self._lock.release()
+                try:
+                    evicted.close_stream()
+                finally:
+                    self._lock.acquire()
+            self._open_files += 1
+            self.opens += 1
+            handler.close_requested = False
+            self._handlers[handler] = None
+        try:
+            return opener()
+        except BaseException:
+            self.closed(handler)
+            raise
+
+    def closed(self, handler):
+        with self._lock:
+            self._open_files -= 1
+            self.closes += 1
+            self._handlers.pop(handler, None)
+            self._closed_file.notify_all()
+
+    def touch(self, handler):
+        """
+        mark handler as most recently used
+        """
+        with self._lock:
+            if handler in self._handlers:
+                self._handlers.move_to_end(handler)
+
+    def stats(self):
+        with self._lock:
+            return {'open': self._open_files, 'max_open': self.max_open, 'opens': self.opens,
+                    'closes': self.closes}
+
+
+class PooledFileHandler(logging.FileHandler):
+    """
+    file handler that opens its file lazily and lets the FileHandlePool close it
+
+    every open goes through _open (called by emit under the handler lock), so the pool counts all of them.
+    an opening handler waits for the lock of the handler it evicts. that can't deadlock: a handler that is
+    opening has no open file, so it is never evicted itself.
+    """
+    close_requested = False
+
+    def __init__(self, filename, pool):
+        super().__init__(filename, mode='a', delay=True)
+        self.pool = pool
+
+    def _open(self):
+        return self.pool.open(self, super()._open)
+
+    def emit(self, record):
+        self.pool.touch(self)
+        super().emit(record)
+
+    def close_stream(self):
+        self.acquire()
+        try:
+            self._close_requested_stream()
+        finally:
+            self.release()
+
+    def _close_requested_stream(self):
+        # the handler may have opened its file again since the request (it is in the pool again then)
+        if self.close_requested and self.stream is not None:
+            self.stream.flush()
+            self.stream.close()
+            self.stream = None
+            self.pool.closed(self)
+        self.close_requested = False
+
+    def close(self):
+        self.close_requested = True
+        self.close_stream()
+        super().close()
+
+
+class PooledBatchFileHandler(BatchFlushMixin, PooledFileHandler):
+    pass
+
+
+class BatchQueueListener(QueueListener):
+    """
+    queue listener that takes up to batch_size records from the queue, handles them and flushes once
+    """
+
+    def __init__(self, log_queue, *handlers, batch_size=100):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def enqueue_sentinel(self):
+        # blocking put: the sentinel must not be dropped when the queue is full
+        self.queue.put(self._sentinel)
+
+    def _monitor(self):
+        log_queue = self.queue
+        while True:
+            batch = [log_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    self.handle(record)
+                log_queue.task_done()
+            for handler in self.handlers:
+                handler.flush_batch()
+            if stop:
+                break
 
 
 class Logger:
@@ -7,8 +250,17 @@ class Logger:
 
     because we need to create a logger for each file, and then we can use it in all of our classes.
     creating a logger is a heavy operation, so we don't want to do it more than once for each file.
+
+    with a lot of log files (e.g. one per tenant) call Logger.limit_open_files(n) before creating the loggers,
+    then at most n log files are open at the same time.
     """
     _instance = {}
+    file_handle_pool = None
+
+    @classmethod
+    def limit_open_files(cls, max_open):
+        cls.file_handle_pool = FileHandlePool(max_open)
+        return cls.file_handle_pool
 
     def __new__(cls, log_file="app.log", *args, **kwargs):
         """
@@ -18,22 +270,68 @@ class Logger:
             cls._instance[log_file] = super().__new__(cls)
         return cls._instance[log_file]
 
-    def __init__(self, log_file="app.log"):
+    def __init__(self, log_file="app.log", use_queue=False, queue_size=10_000, overflow='block', batch_size=100,
+                 console=True):
+        """
+        use_queue: the caller only puts the record in a bounded queue, a background thread writes it to the handlers.
+        overflow is the policy when the queue is full ('block', 'drop-oldest' or 'drop-new').
+        """
         if not hasattr(self, 'logger'):
+            self.log_file = log_file
             self.logger = logging.getLogger(log_file)
             self.logger.setLevel(logging.DEBUG)  # تنظیم سطح لاگ
             formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 
-            file_handler = logging.FileHandler(log_file)
+            if self.file_handle_pool is not None:
+                handler_class = PooledBatchFileHandler if use_queue else PooledFileHandler
+                file_handler = handler_class(log_file, self.file_handle_pool)
+            else:
+                file_handler = BatchFileHandler(log_file) if use_queue else logging.FileHandler(log_file)
             file_handler.setLevel(logging.DEBUG)
             file_handler.setFormatter(formatter)
+            handlers = [file_handler]
 
-            console_handler = logging.StreamHandler()
-            console_handler.setLevel(logging.INFO)
-            console_handler.setFormatter(formatter)
+            if console:
+                console_handler = BatchStreamHandler() if use_queue else logging.StreamHandler()
+                console_handler.setLevel(logging.INFO)
+                console_handler.setFormatter(formatter)
+                handlers.append(console_handler)
 
-            self.logger.addHandler(file_handler)
-            self.logger.addHandler(console_handler)
+            self.queue_handler = None
+            self.listener = None
+            if use_queue:
+                log_queue = queue.Queue(maxsize=queue_size)
+                self.queue_handler = OverflowQueueHandler(log_queue, overflow)
+                self.listener = BatchQueueListener(log_queue, *handlers, batch_size=batch_size)
+                self.listener.start()
+                self.logger.addHandler(self.queue_handler)
+                atexit.register(self.shutdown)
+            else:
+                for handler in handlers:
+                    self.logger.addHandler(handler)
+            self.handlers = handlers
+
+    @property
+    def dropped(self):
+        return self.queue_handler.dropped if self.queue_handler else 0
+
+    def shutdown(self):
+        """
+        write all records that are still in the queue and close the handlers.
+        the logger is removed from the instances, Logger(log_file) creates a new one after this
+        """
+        if self._instance.get(self.log_file) is self:
+            del self._instance[self.log_file]
+        if self.listener is not None:
+            atexit.unregister(self.shutdown)
+            # no new records after the stop sentinel
+            self.logger.removeHandler(self.queue_handler)
+            self.listener.stop()
+            self.listener = None
+        for handler in self.handlers:
+            self.logger.removeHandler(handler)
+            handler.close()
+        self.handlers = []
 
     def info(self, message):
         self.logger.info(message)
@@ -46,12 +344,14 @@ class Logger:
 
 
 class UserContext:
-    _instances = {}
+    """
+    one context per user id. workers see a lot of users, so the registry is bounded:
+    at most 10000 contexts and each one lives for one hour.
+    """
+    _instances = MultitonRegistry(max_size=10_000, ttl=3600)
 
     def __new__(cls, user_id, *args, **kwargs):
-        if user_id not in cls._instances:
-            cls._instances[user_id] = super(UserContext, cls).__new__(cls)
-        return cls._instances[user_id]
+        return cls._instances.get_or_create(user_id, lambda: super(UserContext, cls).__new__(cls))
 
     def __init__(self, user_id):
         self.user_id = user_id
@@ -64,25 +364,39 @@ class UserContext:
         return self.data.get(key, default)
 
 
-logger1 = Logger()
-logger2 = Logger()
-logger3 = Logger(log_file="test.log")
+if __name__ == "__main__":
+    logger1 = Logger()
+    logger2 = Logger()
+    logger3 = Logger(log_file="test.log")
+
+    logger1.info("This is an INFO message.")
+    logger1.debug("This is a DEBUG message.")
+    logger2.error("This is an ERROR message.")
+    logger3.info("This is an INFO message in test.log.")
+
+    print(logger1 is logger2)
+    print(logger1 is logger3)
 
-logger1.info("This is an INFO message.")
-logger1.debug("This is a DEBUG message.")
-logger2.error("This is an ERROR message.")
-logger3.info("This is an INFO message in test.log.")
+    queue_logger = Logger(log_file="queue.log", use_queue=True, overflow='drop-oldest')
+    queue_logger.info("This is an INFO message written by the queue listener.")
+    queue_logger.shutdown()
+    print(f'dropped records: {queue_logger.dropped}')
 
-print(logger1 is logger2)
-print(logger1 is logger3)
+    pool = Logger.limit_open_files(2)
+    tenant_loggers = [Logger(log_file=f"tenant_{tenant}.log", console=False) for tenant in range(5)]
+    for round_number in range(3):
+        for tenant_logger in tenant_loggers:
+            tenant_logger.info(f"round {round_number}")
+    print(f'file handle pool: {pool.stats()}')
 
-user1_context = UserContext(1)
-user2_context = UserContext(2)
-user1_context_duplicate = UserContext(1)
+    user1_context = UserContext(1)
+    user2_context = UserContext(2)
+    user1_context_duplicate = UserContext(1)
 
-user1_context.set("language", "fa")
-user2_context.set("language", "en")
+    user1_context.set("language", "fa")
+    user2_context.set("language", "en")
 
-print(user1_context.get("language"))
-print(user2_context.get("language"))
-print(user1_context is user1_context_duplicate)
+    print(user1_context.get("language"))
+    print(user2_context.get("language"))
+    print(user1_context is user1_context_duplicate)
+    print(UserContext._instances.stats())
@@ -0,0 +1,57 @@
+"""
+caller side latency of Logger with and without the queue
+
+run from the codes directory: python -m Creational.Multiton.logger_benchmark
+on a fast local disk (page cache) the queue mostly improves p50/p99, the background thread competes with the
+caller for the GIL. the gain grows with slow handlers, e.g. --console with a real terminal or a network disk.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from Creational.Multiton.example import Logger
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def measure(logger, messages):
+    latencies = []
+    for i in range(messages):
+        start = time.perf_counter()
+        logger.info(f'message number {i}')
+        latencies.append(time.perf_counter() - start)
+    drain_start = time.perf_counter()
+    logger.shutdown()
+    return latencies, time.perf_counter() - drain_start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=100_000)
+    parser.add_argument('--queue-size', type=int, default=10_000)
+    parser.add_argument('--console', action='store_true', help='also write records to stderr')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        scenarios = {
+            'sync': {},
+            'queue block': {'use_queue': True, 'overflow': 'block'},
+            'queue drop-oldest': {'use_queue': True, 'overflow': 'drop-oldest'},
+            'queue drop-new': {'use_queue': True, 'overflow': 'drop-new'},
+        }
+        for name, options in scenarios.items():
+            log_file = os.path.join(directory, name.replace(' ', '_') + '.log')
+            logger = Logger(log_file, queue_size=args.queue_size, console=args.console, **options)
+            latencies, drain_time = measure(logger, args.messages)
+            print(f'{name:<18} p50: {percentile(latencies, 50) * 1e6:6.1f} us  '
+                  f'p99: {percentile(latencies, 99) * 1e6:6.1f} us  '
+                  f'total: {sum(latencies) * 1000:7.1f} ms  drain: {drain_time * 1000:6.1f} ms  '
+                  f'dropped: {logger.dropped}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+contention benchmark for singleton metaclasses
+
+N threads wait on a barrier and then call the class at the same moment.
+for each metaclass we report how many times the (slow) constructor ran and the p99 latency of the first access.
+"""
+import argparse
+import threading
+import time
+
+from concept import SingletonMeta, ThreadSafeSingletonMeta
+
+
+def make_class(metaclass, construct_time, counter):
+    class SlowResource(metaclass=metaclass):
+        def __init__(self):
+            # simulate a slow constructor (like opening a database connection)
+            counter.append(1)
+            time.sleep(construct_time)
+
+    return SlowResource
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(metaclass, threads_count, construct_time):
+    counter = []
+    resource_class = make_class(metaclass, construct_time, counter)
+    barrier = threading.Barrier(threads_count)
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def worker():
+        barrier.wait()
+        start = time.perf_counter()
+        resource_class()
+        elapsed = time.perf_counter() - start
+        with latencies_lock:
+            latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'constructions': len(counter),
+        'p99_first_access_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--construct-time', type=float, default=0.05, help='constructor time in seconds')
+    args = parser.parse_args()
+
+    for metaclass in (SingletonMeta, ThreadSafeSingletonMeta):
+        result = run(metaclass, args.threads, args.construct_time)
+        print(f"{metaclass.__name__:<25} constructions: {result['constructions']:<5} "
+              f"p99 first access: {result['p99_first_access_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
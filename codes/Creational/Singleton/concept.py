@@ -1,14 +1,177 @@
+import asyncio
+import contextvars
+import os
+import threading
+import weakref
+
+
 class SingletonMeta(type):
     """
     use this metaclass to create singleton class
+
+    what happens to the instance in a forked child process is chosen by the `fork_policy` class attribute:
+    - 'keep' (default): the child uses the instance inherited from the parent
+    - 'reset': the child drops the instance and creates its own one on first use
+    - 'reinitialize': the child keeps the instance and calls its `after_fork()` method
     """
     _instance = {}
+    _classes = weakref.WeakSet()
+    fork_policies = ('keep', 'reset', 'reinitialize')
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        if getattr(cls, 'fork_policy', 'keep') not in SingletonMeta.fork_policies:
+            raise ValueError(f'fork_policy must be one of {SingletonMeta.fork_policies}')
+        SingletonMeta._classes.add(cls)
 
     def __call__(cls, *args, **kwargs):
         if cls not in cls._instance:
             cls._instance[cls] = super(SingletonMeta, cls).__call__(*args, **kwargs)
         return cls._instance[cls]
 
+    def _after_fork(cls):
+        instance = cls._instance.get(cls)
+        if instance is None:
+            return
+        policy = getattr(cls, 'fork_policy', 'keep')
+        if policy == 'reset':
+            del cls._instance[cls]
+        elif policy == 'reinitialize':
+            instance.after_fork()
+
+    @staticmethod
+    def _after_fork_in_child():
+        for cls in list(SingletonMeta._classes):
+            cls._after_fork()
+
+
+class ThreadSafeSingletonMeta(SingletonMeta):
+    """
+    thread safe version of SingletonMeta
+
+    every class gets its own lock, so slow constructors of different classes never wait for each other.
+    double-checked locking: once the instance exists, lookup doesn't take any lock.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._singleton_lock = threading.Lock()
+
+    def __call__(cls, *args, **kwargs):
+        instance = cls._instance.get(cls)
+        if instance is None:
+            with cls._singleton_lock:
+                # another thread may have created it while we were waiting for the lock
+                instance = cls._instance.get(cls)
+                if instance is None:
+                    instance = type.__call__(cls, *args, **kwargs)
+                    cls._instance[cls] = instance
+        return instance
+
+    def _after_fork(cls):
+        # the lock may have been held by a thread of the parent, that thread doesn't exist in the child
+        cls._singleton_lock = threading.Lock()
+        super()._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=SingletonMeta._after_fork_in_child)
+
+
+class ThreadLocalSingletonMeta(type):
+    """
+    use this metaclass to create one instance per thread
+
+    useful for resources that can't be shared between threads (like sqlite connections).
+    no lock is needed, every thread only sees its own instance.
+    call `ClassName.teardown_instance()` when the thread is done, it calls the instance `teardown()` method if it exists.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._thread_local = threading.local()
+
+    def __call__(cls, *args, **kwargs):
+        instance = getattr(cls._thread_local, 'instance', None)
+        if instance is None:
+            instance = cls._thread_local.instance = super().__call__(*args, **kwargs)
+        return instance
+
+    def teardown_instance(cls):
+        instance = getattr(cls._thread_local, 'instance', None)
+        if instance is None:
+            return
+        del cls._thread_local.instance
+        teardown = getattr(instance, 'teardown', None)
+        if teardown is not None:
+            teardown()
+
+
+class ContextSingletonMeta(type):
+    """
+    use this metaclass to create one instance per contextvars context (e.g. per asyncio task or per request)
+
+    asyncio tasks copy the context when they are created, so a task sees the instance of its parent if the parent
+    had one, otherwise the task creates its own instance, that is not visible to other tasks.
+    call `ClassName.teardown_instance()` at the end of the request, it calls the instance `teardown()` method if it exists.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._context_instance = contextvars.ContextVar(f'{name}_instance', default=None)
+
+    def __call__(cls, *args, **kwargs):
+        instance = cls._context_instance.get()
+        if instance is None:
+            instance = super().__call__(*args, **kwargs)
+            cls._context_instance.set(instance)
+        return instance
+
+    def teardown_instance(cls):
+        instance = cls._context_instance.get()
+        if instance is None:
+            return
+        cls._context_instance.set(None)
+        teardown = getattr(instance, 'teardown', None)
+        if teardown is not None:
+            teardown()
+
+
+class AsyncSingletonMeta(type):
+    """
+    use this metaclass to create singleton class with async initialization
+
+    create the instance with `await ClassName.instance()`, the class can define `async def initialize(self)`.
+    the first caller starts one initialization task and every concurrent caller awaits the same task.
+    if initialization fails, the error is raised for all waiters and the next call tries again.
+    """
+    _instance = {}
+    _pending = {}
+
+    def __call__(cls, *args, **kwargs):
+        if cls not in cls._instance:
+            raise RuntimeError(f'{cls.__name__} is async singleton, use `await {cls.__name__}.instance()`')
+        return cls._instance[cls]
+
+    async def instance(cls, *args, **kwargs):
+        if cls in cls._instance:
+            return cls._instance[cls]
+        task = cls._pending.get(cls)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(cls._create_instance(*args, **kwargs))
+            cls._pending[cls] = task
+            task.add_done_callback(lambda _: cls._pending.pop(cls, None))
+        # shield: cancelling one waiter must not cancel the shared initialization
+        return await asyncio.shield(task)
+
+    async def _create_instance(cls, *args, **kwargs):
+        instance = type.__call__(cls, *args, **kwargs)
+        initialize = getattr(instance, 'initialize', None)
+        if initialize is not None:
+            await initialize()
+        cls._instance[cls] = instance
+        return instance
+
 
 class BaseClass:
     """
@@ -61,6 +224,7 @@ def singleton(cls):
             cls._instance = cls(*args, **kwargs)
         return cls._instance
 
+    get_instance.__wrapped__ = cls
     return get_instance
 
 
@@ -74,6 +238,51 @@ class SingletonDecorator(BaseClass):
         super().__init__(value)
 
 
+class ThreadSafeSingleton(BaseClass, metaclass=ThreadSafeSingletonMeta):
+    """
+    thread safe singleton class using metaclass
+    """
+
+    def __init__(self, value):
+        super().__init__(value)
+
+
+class AsyncSingleton(BaseClass, metaclass=AsyncSingletonMeta):
+    """
+    singleton class with async initialization
+    """
+
+    def __init__(self, value):
+        super().__init__(value)
+
+    async def initialize(self):
+        await asyncio.sleep(0.1)
+
+
+class ThreadLocalSingleton(BaseClass, metaclass=ThreadLocalSingletonMeta):
+    """
+    one instance per thread
+    """
+
+    def __init__(self, value):
+        super().__init__(value)
+
+    def teardown(self):
+        print(f'teardown thread local instance {self.value}')
+
+
+class ContextSingleton(BaseClass, metaclass=ContextSingletonMeta):
+    """
+    one instance per context (asyncio task)
+    """
+
+    def __init__(self, value):
+        super().__init__(value)
+
+    def teardown(self):
+        print(f'teardown context instance {self.value}')
+
+
 def metaclass_singleton():
     print('metaclass singleton infos')
     s1 = Singleton(1)
@@ -83,6 +292,64 @@ def metaclass_singleton():
     print(f'is s1 == s2: {s1 is s2}')
 
 
+def thread_safe_singleton():
+    print('thread safe singleton infos')
+    instances = []
+    threads = [threading.Thread(target=lambda i=i: instances.append(ThreadSafeSingleton(i))) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f'all instances are the same: {all(instance is instances[0] for instance in instances)}')
+
+
+def async_singleton():
+    print('async singleton infos')
+
+    async def create_instances():
+        return await asyncio.gather(*(AsyncSingleton.instance(i) for i in range(10)))
+
+    instances = asyncio.run(create_instances())
+    instances[0].show_id('first')
+    print(f'all instances are the same: {all(instance is instances[0] for instance in instances)}')
+
+
+def thread_local_singleton():
+    print('thread local singleton infos')
+    results = {}
+
+    def worker(name):
+        first = ThreadLocalSingleton(name)
+        results[name] = (first, first is ThreadLocalSingleton(name))
+        ThreadLocalSingleton.teardown_instance()
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ('t1', 't2')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f'same instance in one thread: {all(same for _, same in results.values())}')
+    print(f'different instances in different threads: {results["t1"][0] is not results["t2"][0]}')
+
+
+def context_singleton():
+    print('context singleton infos')
+
+    async def handle_request(request_id):
+        instance = ContextSingleton(request_id)
+        await asyncio.sleep(0.01)
+        same = instance is ContextSingleton(request_id)
+        ContextSingleton.teardown_instance()
+        return instance, same
+
+    async def serve():
+        return await asyncio.gather(handle_request('r1'), handle_request('r2'))
+
+    (first, first_same), (second, second_same) = asyncio.run(serve())
+    print(f'same instance in one request: {first_same and second_same}')
+    print(f'different instances in different requests: {first is not second}')
+
+
 def class_singleton():
     print('class singleton infos')
     s3 = SingletonClass(3)
@@ -104,6 +371,14 @@ def decorator_singleton():
 if __name__ == "__main__":
     metaclass_singleton()
     print('*' * 25)
+    thread_safe_singleton()
+    print('*' * 25)
+    async_singleton()
+    print('*' * 25)
+    thread_local_singleton()
+    print('*' * 25)
+    context_singleton()
+    print('*' * 25)
     class_singleton()
     print('*' * 25)
     decorator_singleton()
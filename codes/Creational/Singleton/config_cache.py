@@ -0,0 +1,148 @@
+"""
+compiled binary cache for json config files
+
+parsing a big json config on every process start is slow. the parsed config is saved next to the source file
+with marshal, and it is used as long as the source file didn't change.
+loading a big config mostly allocates containers, so the cyclic garbage collector is paused while the cache
+is unmarshalled (the loaded data can't contain cycles, there is nothing for it to find).
+
+mtime and size are only trusted for a source file that was already older than MTIME_GRANULARITY_NS when it
+was read for the cache (like the racy git check): an edit of the same size right after the read can keep the
+same mtime on file systems with coarse timestamps, such a file is checked by its hash until it is old enough.
+"""
+from contextlib import contextmanager
+import gc
+import hashlib
+import json
+import marshal
+import os
+import time
+
+CACHE_VERSION = 2
+CACHE_SUFFIX = '.marshal'
+# coarsest mtime resolution of common file systems (FAT has 2 seconds)
+MTIME_GRANULARITY_NS = 2_000_000_000
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            content = cache_file.read()
+        with gc_paused():
+            version, *cached = marshal.loads(content)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != CACHE_VERSION:
+        return None
+    # mtime_ns, size, checked_ns, digest, data
+    return cached
+
+
+def _write_cache(cache_path, mtime_ns, size, checked_ns, digest, data):
+    # write to a temp file and rename, so another process never reads a half written cache
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        with open(temp_path, 'wb') as cache_file:
+            marshal.dump((CACHE_VERSION, mtime_ns, size, checked_ns, digest, data), cache_file)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        # cache is only an optimization, a read only directory must not break loading config
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_json_cached(path, cache_path=None):
+    """
+    load json file, served from the compiled cache when it is valid
+
+    - same mtime and size, and the file was old enough when it was checked: cache is used without reading
+      the source file
+    - otherwise the same content hash (e.g. file touched or copied, or modified just before it was checked):
+      cache is used and its header updated
+    - otherwise the json is parsed again and the cache rebuilt
+    """
+    cache_path = cache_path or path + CACHE_SUFFIX
+    stat = os.stat(path)
+    cached = _read_cache(cache_path)
+    if cached is not None:
+        mtime_ns, size, checked_ns, digest, data = cached
+        if (mtime_ns == stat.st_mtime_ns and size == stat.st_size
+                and mtime_ns < checked_ns - MTIME_GRANULARITY_NS):
+            return data
+
+    # taken before the file is read, an edit after this gets a newer mtime or is inside the granularity
+    checked_ns = time.time_ns()
+    current_digest = file_hash(path)
+    if cached is not None and cached[3] == current_digest:
+        data = cached[4]
+    else:
+        with open(path, 'r') as config_file:
+            data = json.load(config_file)
+    _write_cache(cache_path, stat.st_mtime_ns, stat.st_size, checked_ns, current_digest, data)
+    return data
+
+
+def startup_benchmark(entries=200_000, rounds=5):
+    """
+    compare loading a multi megabyte config with json and with the compiled cache
+    """
+    import tempfile
+
+    config = {
+        'app_name': 'DesignPattern',
+        'features': {f'feature_{i}': {'enabled': i % 2 == 0, 'weight': i / 7, 'tags': ['a', 'b', str(i)]}
+                     for i in range(entries)},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'config.json')
+        with open(path, 'w') as config_file:
+            json.dump(config, config_file)
+        # an established config file, a just written one is checked by its hash (see MTIME_GRANULARITY_NS)
+        old = time.time() - 60
+        os.utime(path, (old, old))
+        print(f'config size: {os.path.getsize(path) / 1024 / 1024:.1f} MB')
+
+        def measure(load):
+            best = float('inf')
+            for _ in range(rounds):
+                gc.collect()
+                start = time.perf_counter()
+                data = load()
+                best = min(best, time.perf_counter() - start)
+                del data
+            return best
+
+        def load_json():
+            with open(path, 'r') as config_file:
+                return json.load(config_file)
+
+        json_time = measure(load_json)
+        load_json_cached(path)  # build the cache
+        cached_time = measure(lambda: load_json_cached(path))
+        assert load_json_cached(path) == load_json()
+
+        print(f'json load:   {json_time * 1000:.1f} ms')
+        print(f'cached load: {cached_time * 1000:.1f} ms ({json_time / cached_time:.1f}x faster)')
+
+
+if __name__ == "__main__":
+    startup_benchmark()
@@ -1,13 +1,24 @@
-from concept import SingletonMeta
+from concept import ThreadSafeSingletonMeta, AsyncSingletonMeta, ThreadLocalSingletonMeta
+from config_cache import load_json_cached
+from types import MappingProxyType
+import asyncio
 import json
+import os
+import sqlite3
+import threading
+import time
 
 
-class DatabaseConnection(metaclass=SingletonMeta):
+class DatabaseConnection(metaclass=ThreadSafeSingletonMeta):
     """
     why use singleton design pattern in database connection?
 
     because we need to connect to database only once, and then we can use it in all of our classes.
+
+    a connection (socket) must not be shared between processes, so a forked worker drops the inherited
+    connection and connects again on first use.
     """
+    fork_policy = 'reset'
 
     def __init__(self):
         # initialize the connection
@@ -24,7 +35,7 @@ print(db1.connection)
 print(db1 is db2)
 
 
-class ConfigManager(metaclass=SingletonMeta):
+class ConfigManager(metaclass=ThreadSafeSingletonMeta):
     """
     why use singleton design pattern in config manager?
 
@@ -37,8 +48,8 @@ class ConfigManager(metaclass=SingletonMeta):
 
     @staticmethod
     def load_config():
-        with open('config.json', 'r') as config_file:
-            return json.load(config_file)
+        # served from the compiled cache (config.json.marshal) while config.json doesn't change
+        return load_json_cached('config.json')
 
 
 config1 = ConfigManager()
@@ -46,3 +57,172 @@ config2 = ConfigManager()
 
 print(config1.config)
 print(config1 is config2)
+
+
+def freeze(value):
+    """
+    make an immutable copy of parsed json (dict -> MappingProxyType, list -> tuple)
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class ReloadableConfigManager(metaclass=ThreadSafeSingletonMeta):
+    """
+    config manager that can reload config without restarting the process.
+
+    `reload_if_changed` only checks mtime and size of the file (cheap), and parses it only when it changed.
+    the new config is built completely and then swapped in one assignment, so readers never take a lock
+    and never see a half-built config. readers should take `config` once and use that snapshot.
+    """
+
+    def __init__(self, path='config.json'):
+        self.path = path
+        self.reload_count = 0
+        self.last_parse_duration = 0.0
+        self._signature = None
+        self._snapshot = MappingProxyType({})
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self.reload_if_changed()
+
+    @property
+    def config(self):
+        return self._snapshot
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload_if_changed(self):
+        """
+        reload config if the file changed, return True if a new snapshot was swapped in
+        """
+        # the lock is only for writers, two reloads at the same time would parse the file twice
+        with self._reload_lock:
+            signature = self._file_signature()
+            if signature == self._signature:
+                return False
+            start = time.perf_counter()
+            with open(self.path, 'r') as config_file:
+                snapshot = freeze(json.load(config_file))
+            self.last_parse_duration = time.perf_counter() - start
+            self._snapshot = snapshot
+            self._signature = signature
+            self.reload_count += 1
+            return True
+
+    def start_watching(self, interval=1.0):
+        """
+        poll the file in a background thread every `interval` seconds
+        """
+        if self._watcher is not None:
+            return
+        self._stop_watching.clear()
+
+        def watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except (OSError, ValueError):
+                    # file is missing or being written right now, keep the old snapshot and try again later
+                    pass
+
+        self._watcher = threading.Thread(target=watch, daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+
+reloadable_config = ReloadableConfigManager()
+print(reloadable_config.config['app_name'])
+print(reloadable_config.reload_if_changed())
+print(f'reload count: {reloadable_config.reload_count}, '
+      f'parse duration: {reloadable_config.last_parse_duration * 1000:.3f} ms')
+
+
+if hasattr(os, 'fork'):
+    pid = os.fork()
+    if pid == 0:
+        # the child gets its own connection
+        print(f'child has its own connection: {DatabaseConnection() is not db1}')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    print(f'parent keeps its connection: {DatabaseConnection() is db1}')
+
+
+class SQLiteConnection(metaclass=ThreadLocalSingletonMeta):
+    """
+    sqlite connections can't be used from another thread, so every thread gets its own connection
+    and reuses it until teardown.
+    """
+
+    def __init__(self, path=':memory:'):
+        self.connection = sqlite3.connect(path)
+
+    def teardown(self):
+        self.connection.close()
+
+
+def sqlite_worker(results):
+    connection = SQLiteConnection().connection
+    results.append((threading.get_ident(), connection.execute('select 1').fetchone()[0]))
+    SQLiteConnection.teardown_instance()
+
+
+sqlite_results = []
+sqlite_threads = [threading.Thread(target=sqlite_worker, args=(sqlite_results,)) for _ in range(3)]
+for sqlite_thread in sqlite_threads:
+    sqlite_thread.start()
+for sqlite_thread in sqlite_threads:
+    sqlite_thread.join()
+print(sqlite_results)
+
+
+class AsyncDatabaseConnection(metaclass=AsyncSingletonMeta):
+    """
+    in asyncio services connecting to database must not block the event loop.
+
+    all coroutines that need the connection before it is ready wait for the same initialization.
+    """
+
+    def __init__(self):
+        self.connection = None
+
+    async def initialize(self):
+        # simulate an async connect
+        await asyncio.sleep(0.1)
+        self.connection = 'async database connected'
+
+
+class AsyncConfigManager(metaclass=AsyncSingletonMeta):
+    """
+    load config in a worker thread, so the event loop is free while the file is read and parsed.
+    """
+
+    def __init__(self):
+        self.config = None
+
+    async def initialize(self):
+        self.config = await asyncio.to_thread(ConfigManager.load_config)
+
+
+async def async_main():
+    connections = await asyncio.gather(*(AsyncDatabaseConnection.instance() for _ in range(5)))
+    print(connections[0].connection)
+    print(all(connection is connections[0] for connection in connections))
+
+    config = await AsyncConfigManager.instance()
+    print(config.config)
+    print(config is await AsyncConfigManager.instance())
+
+
+asyncio.run(async_main())
@@ -0,0 +1,166 @@
+"""
+micro benchmarks for the singleton and multiton implementations (metaclass, __new__ and decorator)
+
+run from the codes directory: python -m Creational.benchmark --output report.json
+for every implementation it measures:
+- lookup: calling the class when the instance already exists (single thread and multi thread)
+- construction: creating a new instance (singleton registry is reset, multiton uses a new key)
+- memory: bytes allocated per new instance (tracemalloc)
+"""
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+
+from Creational.Singleton.concept import (Singleton, SingletonClass, SingletonDecorator, SingletonMeta,
+                                          ThreadSafeSingleton)
+from Creational.Multiton.concept import Multiton, MultitonClass, MultitonDecorator
+
+
+def reset_singleton_meta(cls):
+    def reset():
+        SingletonMeta._instance.pop(cls, None)
+    return reset
+
+
+def reset_singleton_class():
+    SingletonClass._instance = None
+
+
+def reset_singleton_decorator():
+    SingletonDecorator.__wrapped__._instance = None
+
+
+SINGLETONS = {
+    'Singleton': (Singleton, reset_singleton_meta(Singleton)),
+    'ThreadSafeSingleton': (ThreadSafeSingleton, reset_singleton_meta(ThreadSafeSingleton)),
+    'SingletonClass': (SingletonClass, reset_singleton_class),
+    'SingletonDecorator': (SingletonDecorator, reset_singleton_decorator),
+}
+
+MULTITONS = {
+    'Multiton': Multiton,
+    'MultitonClass': MultitonClass,
+    'MultitonDecorator': MultitonDecorator,
+}
+
+
+def ns_per_call(function, calls):
+    start = time.perf_counter_ns()
+    function(calls)
+    return (time.perf_counter_ns() - start) / calls
+
+
+def threaded_ops_per_sec(work, threads_count, calls):
+    barrier = threading.Barrier(threads_count + 1)
+
+    def worker():
+        barrier.wait()
+        work(calls)
+
+    threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return threads_count * calls / (time.perf_counter() - start)
+
+
+def bytes_per_instance(create, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    create(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def bench_singleton(cls, reset, calls, threads_count):
+    def lookup(n):
+        for _ in range(n):
+            cls(1)
+
+    def construct(n):
+        for _ in range(n):
+            reset()
+            cls(1)
+
+    instances = []
+
+    def construct_and_keep(n):
+        # keep the instances alive, so tracemalloc sees their memory
+        for _ in range(n):
+            reset()
+            instances.append(cls(1))
+
+    cls(1)
+    result = {
+        'lookup_ns': ns_per_call(lookup, calls),
+        'construction_ns': ns_per_call(construct, calls // 10),
+        'lookup_threaded_ops_per_sec': threaded_ops_per_sec(lookup, threads_count, calls // threads_count),
+        'bytes_per_instance': bytes_per_instance(construct_and_keep, 1000),
+    }
+    reset()
+    return result
+
+
+def bench_multiton(cls, calls, threads_count):
+    offset = [0]
+
+    def new_keys(n):
+        start = offset[0]
+        offset[0] += n
+        for key in range(start, start + n):
+            cls(('bench', key))
+
+    def lookup(n):
+        for _ in range(n):
+            cls(('bench', 0))
+
+    def lookup_many_keys(n):
+        for key in range(n):
+            cls(('bench', key % 1000))
+
+    new_keys(1000)
+    return {
+        'lookup_ns': ns_per_call(lookup, calls),
+        'construction_ns': ns_per_call(new_keys, calls // 10),
+        'lookup_threaded_ops_per_sec': threaded_ops_per_sec(lookup_many_keys, threads_count, calls // threads_count),
+        'bytes_per_instance': bytes_per_instance(new_keys, 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=200_000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--output', help='write the json report to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'calls': args.calls,
+        'threads': args.threads,
+        'results': {},
+    }
+    for name, (cls, reset) in SINGLETONS.items():
+        report['results'][name] = bench_singleton(cls, reset, args.calls, args.threads)
+    for name, cls in MULTITONS.items():
+        report['results'][name] = bench_multiton(cls, args.calls, args.threads)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()